@@ -0,0 +1,29 @@
+# Shared prompts for the chat engine and the batch QA mode
+
+SYSTEM_PROMPT = (
+    "You are a helpful AI Assistant for the PMA Bootcamp. "
+    "Use the provided context to answer questions. "
+    "CRITICAL: DO NOT SUMMARIZE LISTS OF LINKS. "
+    "If the context provides a list of resources, videos, or tools, "
+    "you must output EVERY SINGLE URL found in the context. "
+    "Do not group them. List them individually with their full clickable markdown syntax. "
+    "If you don't know the answer, say so."
+)
+
+# Single-shot (no history) answer prompt used by `python src/main.py batch`
+BATCH_CONTEXT_PROMPT = (
+    "Here are the relevant documents for the context:\n\n"
+    "{context_str}\n\n"
+    "Instruction: Based on the above documents, answer the question below.\n"
+    "Question: {question}"
+)
+
+# Background summarization of older chat turns (keeps condense prompts short)
+SUMMARIZE_HISTORY_PROMPT = (
+    "Summarize the conversation below between a PMA Bootcamp student and the assistant. "
+    "Keep the facts the student shared (role, week, goals), the questions they asked, "
+    "and any URLs the assistant gave. Be concise.\n\n"
+    "Previous summary:\n{previous_summary}\n\n"
+    "Conversation:\n{transcript}\n\n"
+    "Summary:"
+)
@@ -1,5 +1,7 @@
 import os
+import secrets
 
+import chromadb
 from dotenv import load_dotenv
 from llama_index.core import Settings
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
@@ -13,6 +15,7 @@ class AppSettings:
     # Paths
     DATA_RAW_DIR = os.getenv("DATA_RAW_DIR", "data/raw")
     DATA_SILVER_DIR = os.getenv("DATA_SILVER_DIR", "data/silver")
+    GOLD_SET_PATH = os.getenv("GOLD_SET_PATH", "data/gold/test_set.json")
 
     # ChromaDB Settings
     # Default to 'localhost' for running scripts on your laptop
@@ -20,6 +23,9 @@ class AppSettings:
     CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
     CHROMA_PORT = int(os.getenv("CHROMA_PORT", 8000))
     COLLECTION_NAME = os.getenv("COLLECTION_NAME", "discord_rag_bot")
+    # 'http' = Chroma container, 'local' = in-process PersistentClient (laptop / load tests)
+    CHROMA_MODE = os.getenv("CHROMA_MODE", "http")
+    CHROMA_LOCAL_PATH = os.getenv("CHROMA_LOCAL_PATH", "storage/chroma")
 
     # Model Settings
     EMBED_MODEL_NAME = "BAAI/bge-m3"
@@ -27,15 +33,69 @@ class AppSettings:
 
     HYBRID_VECTOR_WEIGHT = 5.0
     HYBRID_BM25_WEIGHT = 3.0
+    # Near-duplicate chunk collapse at index build time (MinHash/LSH over word 5-grams)
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.85))  # estimated Jaccard similarity
+
     # Storage Paths
     STORAGE_DIR = "storage"
     NODES_INDEX_PATH = os.path.join(STORAGE_DIR, "silver_nodes.pkl")
 
-    # Point to your vLLM container
-    LLM_API_BASE = "http://localhost:8001/v1"
+    # Point to your vLLM container (or the stub server: `python src/main.py stub-llm`)
+    LLM_API_BASE = os.getenv("LLM_API_BASE", "http://localhost:8001/v1")
     LLM_MODEL = "hugging-quants/Meta-Llama-3.1-8B-Instruct-AWQ-INT4"
     LLM_API_KEY = "EMPTY"
 
+    # Admission Control (one vLLM GPU is shared by every session)
+    MAX_CONCURRENT_GENERATIONS = int(os.getenv("MAX_CONCURRENT_GENERATIONS", 4))
+    # Max seconds a request may wait for a slot before it is rejected with a retry hint
+    ADMISSION_DEADLINES = {
+        "interactive": float(os.getenv("ADMISSION_INTERACTIVE_DEADLINE", 20)),
+        "batch": float(os.getenv("ADMISSION_BATCH_DEADLINE", 120)),
+    }
+    # Starting guess for how long one chat turn holds a slot (refined at runtime)
+    ADMISSION_INITIAL_SERVICE_TIME = float(os.getenv("ADMISSION_INITIAL_SERVICE_TIME", 5))
+
+    # Conversation Memory
+    MEMORY_TOKEN_LIMIT = int(os.getenv("MEMORY_TOKEN_LIMIT", 3000))
+    # Once raw history passes this, older turns are summarized in the background...
+    MEMORY_SUMMARIZE_THRESHOLD = int(os.getenv("MEMORY_SUMMARIZE_THRESHOLD", 2000))
+    # ...keeping roughly this many tokens of recent turns verbatim
+    MEMORY_KEEP_RECENT_TOKENS = int(os.getenv("MEMORY_KEEP_RECENT_TOKENS", 800))
+    # Background summaries run outside the admission slots, so they never queue interactive
+    # questions; this caps how many run at once (each one is an extra request on vLLM).
+    MAX_CONCURRENT_SUMMARIES = int(os.getenv("MAX_CONCURRENT_SUMMARIES", 1))
+    # Sessions idle longer than this get their history compressed
+    SESSION_IDLE_COMPACT_SECONDS = int(os.getenv("SESSION_IDLE_COMPACT_SECONDS", 300))
+    # Past this many sessions, the least recently used one (and its history) is dropped
+    MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", 1000))
+
+    # Diagnostics (profiling / tracemalloc endpoints under /api/admin)
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # required in X-Admin-Token; unset = endpoints disabled
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))  # seconds
+    PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "debug_reports/profiles")
+    PROFILE_KEEP_LAST = int(os.getenv("PROFILE_KEEP_LAST", 20))
+    TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", 10))
+
+    # Tracing (Phoenix UI). Disable for load tests so tracing overhead doesn't skew numbers.
+    PHOENIX_ENABLED = os.getenv("PHOENIX_ENABLED", "true").lower() == "true"
+
+    # Traffic Recording: if set, every chat request is appended (anonymized) to this JSONL
+    TRAFFIC_RECORD_PATH = os.getenv("TRAFFIC_RECORD_PATH", "")
+    # Salt for hashing session ids (if empty: generated once and kept in <path>.salt)
+    TRAFFIC_RECORD_SALT = os.getenv("TRAFFIC_RECORD_SALT", "")
+
+    # Batch QA (`python src/main.py batch`)
+    # Batch talks to vLLM directly, outside admission control: its requests come on top of the
+    # API's MAX_CONCURRENT_GENERATIONS. Keep it low while the bot is live; raise it off-hours.
+    BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", 2))  # concurrent LLM requests
+    BATCH_RETRIEVAL_SIZE = int(os.getenv("BATCH_RETRIEVAL_SIZE", 32))  # questions per retrieval batch
+
+    # Stub LLM (OpenAI-compatible stand-in for vLLM, for local load testing)
+    STUB_LLM_PORT = int(os.getenv("STUB_LLM_PORT", 8001))
+    STUB_LLM_TOKEN_RATE = float(os.getenv("STUB_LLM_TOKEN_RATE", 40))  # tokens / second
+    STUB_LLM_TTFT = float(os.getenv("STUB_LLM_TTFT", 0.3))  # seconds to first token
+
     @staticmethod
     def get_llm():
         # CHANGED: Use OpenAILike here
@@ -49,6 +109,22 @@ class AppSettings:
             timeout=300,
         )
 
+    @staticmethod
+    def is_admin_token(token) -> bool:
+        """True only for the configured ADMIN_TOKEN. With no token configured, nobody is an admin."""
+        if not AppSettings.ADMIN_TOKEN or not token:
+            return False
+        return secrets.compare_digest(token, AppSettings.ADMIN_TOKEN)
+
+    @staticmethod
+    def get_chroma_client():
+        """Chroma server over HTTP, or an in-process client when CHROMA_MODE=local."""
+        if AppSettings.CHROMA_MODE == "local":
+            return chromadb.PersistentClient(path=AppSettings.CHROMA_LOCAL_PATH)
+        return chromadb.HttpClient(
+            host=AppSettings.CHROMA_HOST, port=AppSettings.CHROMA_PORT
+        )
+
 
 def setup_global_settings():
     """Initializes the LlamaIndex global settings."""
@@ -1,18 +1,21 @@
 import os
 import pickle
+from typing import List, Optional
 
 from llama_index.core import SimpleDirectoryReader
 from llama_index.core.node_parser import MarkdownNodeParser
+from llama_index.core.schema import BaseNode
 
 from src.config.settings import AppSettings
+from src.indexing.dedup import dedupe_nodes
+from src.preprocessing.metadata import NodeMetadataTagger
 
 
-def build_bm25_index():
-    print("🏗️  Starting Node Extraction for BM25...")
-
+def load_tagged_nodes() -> Optional[List[BaseNode]]:
+    """Parses the silver files into chunks tagged with filter metadata (None if there is no data)."""
     if not os.path.exists(AppSettings.DATA_SILVER_DIR):
         print(f"❌ Error: Data directory '{AppSettings.DATA_SILVER_DIR}' not found.")
-        return
+        return None
 
     # 1. Load and Parse Documents
     print(f"📖 Reading files from: {AppSettings.DATA_SILVER_DIR}")
@@ -25,6 +28,33 @@ def build_bm25_index():
     nodes = parser.get_nodes_from_documents(documents)
     print(f"🧩 Parsed {len(nodes)} nodes.")
 
+    # Tag role / week / category / source file for filtered retrieval
+    # (these nodes also feed 'ingest', so Chroma gets the same metadata)
+    nodes = NodeMetadataTagger()(nodes)
+    roles = sorted({n.metadata["role"] for n in nodes})
+    print(f"🏷️  Tagged metadata (roles: {', '.join(roles)}).")
+    return nodes
+
+
+def build_bm25_index():
+    print("🏗️  Starting Node Extraction for BM25...")
+
+    nodes = load_tagged_nodes()
+    if nodes is None:
+        return
+
+    # Collapse near-duplicate chunks (repeated link lists / role headers across weekly pages)
+    if AppSettings.DEDUP_ENABLED:
+        nodes, report = dedupe_nodes(nodes, threshold=AppSettings.DEDUP_THRESHOLD)
+        print(
+            f"🧬 Dedup: {report['nodes_before']} -> {report['nodes_after']} nodes "
+            f"({report['clusters']} duplicate clusters collapsed)."
+        )
+        print(
+            f"   Index text: {report['chars_before']:,} -> {report['chars_after']:,} chars "
+            f"(~{report['embedding_savings']:.0%} less embedding time on 'ingest')."
+        )
+
     # 2. Save Nodes to Disk (Pickle)
     print(f"💾 Saving parsed nodes to: {AppSettings.NODES_INDEX_PATH}")
     os.makedirs(os.path.dirname(AppSettings.NODES_INDEX_PATH), exist_ok=True)
@@ -1,7 +1,7 @@
 import os
 import pickle
+import time
 
-import chromadb
 from llama_index.core import StorageContext, VectorStoreIndex
 from llama_index.vector_stores.chroma import ChromaVectorStore
 
@@ -12,14 +12,15 @@ def ingest_to_chroma():
     # 1. Initialize Settings (Load Embed Model)
     setup_global_settings()
 
-    print(
-        f"⚡ Connecting to ChromaDB at {AppSettings.CHROMA_HOST}:{AppSettings.CHROMA_PORT}..."
-    )
+    if AppSettings.CHROMA_MODE == "local":
+        print(f"⚡ Using in-process ChromaDB at {AppSettings.CHROMA_LOCAL_PATH}...")
+    else:
+        print(
+            f"⚡ Connecting to ChromaDB at {AppSettings.CHROMA_HOST}:{AppSettings.CHROMA_PORT}..."
+        )
 
     # 2. Connect to Chroma
-    remote_db = chromadb.HttpClient(
-        host=AppSettings.CHROMA_HOST, port=AppSettings.CHROMA_PORT
-    )
+    remote_db = AppSettings.get_chroma_client()
 
     # Delete the old collection if it exists to prevent duplicate ghost nodes
     print(f"🧹 Checking for existing collection: '{AppSettings.COLLECTION_NAME}'...")
@@ -49,13 +50,16 @@ def ingest_to_chroma():
     # 4. Create Index (Generates Embeddings + Uploads)
     print("🚀 Starting Ingestion to Vector DB (This re-generates embeddings)...")
 
+    start = time.perf_counter()
     VectorStoreIndex(
         nodes,
         storage_context=storage_context,
         show_progress=True,
     )
+    elapsed = time.perf_counter() - start
 
     print("✅ Ingestion Complete! Vector and BM25 indices are now 100% synced.")
+    print(f"⏱️  Embedded {len(nodes)} nodes in {elapsed:.1f}s.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+from llama_index.core.schema import BaseNode
+
+from src.preprocessing.metadata import (
+    ALL_ROLES,
+    MEMBERSHIP_FIELDS,
+    exclude_from_prompts,
+    filter_metadata_keys,
+    membership_key,
+)
+
+# MinHash parameters: 64 permutations split into 16 LSH bands of 4 rows.
+# Pairs above ~0.5 Jaccard become candidates; they are then checked against the real threshold.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM).astype(np.uint64)
+
+# Provenance fields added to canonical nodes (scalar values so Chroma accepts them)
+PROVENANCE_KEYS = ["duplicate_count", "duplicate_sources"]
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    shingles = _shingles(text)
+    if not shingles:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+    # (a * h + b) mod p for every permutation at once; uint64 overflow is part of the hash family
+    with np.errstate(over="ignore"):
+        permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=0)
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def find_duplicate_clusters(nodes: List[BaseNode], threshold: float) -> List[List[int]]:
+    """Groups node positions whose estimated Jaccard similarity is >= threshold (MinHash + LSH)."""
+    signatures = [minhash_signature(n.get_content()) for n in nodes]
+
+    # 1. LSH: nodes sharing any band bucket become candidate pairs
+    buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+    for i, sig in enumerate(signatures):
+        for band in range(BANDS):
+            buckets[(band, sig[band * ROWS : (band + 1) * ROWS].tobytes())].append(i)
+
+    # 2. Verify candidates with the full signature and merge them (union-find)
+    parent = list(range(len(nodes)))
+    checked = set()
+    for members in buckets.values():
+        for a_idx, a in enumerate(members):
+            for b in members[a_idx + 1 :]:
+                if (a, b) in checked:
+                    continue
+                checked.add((a, b))
+                similarity = float(np.mean(signatures[a] == signatures[b]))
+                if similarity >= threshold:
+                    parent[_find(parent, b)] = _find(parent, a)
+
+    clusters: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(nodes)):
+        clusters[_find(parent, i)].append(i)
+    return [sorted(c) for c in clusters.values() if len(c) > 1]
+
+
+def _merge_metadata(canonical: BaseNode, duplicates: List[BaseNode]):
+    """
+    Records provenance and widens filter fields so the merged node still matches every
+    source's filters: role becomes "all", and the membership flags of every source are kept
+    (a chunk merged from week 3 and week 5 pages has both week_3 and week_5, and both files'
+    source_file flags).
+    """
+    group = [canonical] + duplicates
+    sources = []
+    for node in group:
+        name = node.metadata.get("file_name", "Unknown")
+        if name not in sources:
+            sources.append(name)
+
+    canonical.metadata["duplicate_count"] = len(group)
+    canonical.metadata["duplicate_sources"] = " | ".join(sources)
+
+    if len({n.metadata.get("role") for n in group}) > 1:
+        canonical.metadata["role"] = ALL_ROLES
+    for field in MEMBERSHIP_FIELDS:
+        for node in duplicates:
+            value = node.metadata.get(field)
+            if value is not None:
+                canonical.metadata[membership_key(field, value)] = True
+
+    exclude_from_prompts(canonical, PROVENANCE_KEYS + filter_metadata_keys(canonical.metadata))
+
+
+def dedupe_nodes(nodes: List[BaseNode], threshold: float = 0.85) -> Tuple[List[BaseNode], dict]:
+    """
+    Collapses near-duplicate chunks into one canonical node (the longest of each cluster).
+    Returns the kept nodes (original order) and a size report.
+    """
+    clusters = find_duplicate_clusters(nodes, threshold)
+
+    dropped = set()
+    for cluster in clusters:
+        canonical = max(cluster, key=lambda i: (len(nodes[i].get_content()), -i))
+        duplicates = [i for i in cluster if i != canonical]
+        _merge_metadata(nodes[canonical], [nodes[i] for i in duplicates])
+        dropped.update(duplicates)
+
+    kept = [n for i, n in enumerate(nodes) if i not in dropped]
+    chars_before = sum(len(n.get_content()) for n in nodes)
+    chars_after = sum(len(n.get_content()) for n in kept)
+    report = {
+        "nodes_before": len(nodes),
+        "nodes_after": len(kept),
+        "clusters": len(clusters),
+        "chars_before": chars_before,
+        "chars_after": chars_after,
+        # Embedding cost scales with the amount of text sent to bge-m3
+        "embedding_savings": 1 - chars_after / chars_before if chars_before else 0.0,
+    }
+    return kept, report
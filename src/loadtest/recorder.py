@@ -0,0 +1,158 @@
+# src/loadtest/recorder.py
+"""
+Records the production query stream (anonymized) so it can be replayed locally.
+
+Each chat request becomes one JSONL line:
+    {"t": 1760868753.53, "endpoint": "chat/stream", "session": "3f9a1c...", "query": "...",
+     "priority": "interactive", "role": "engineer", "week": null, "category": null,
+     "source_file": null}
+`t` is wall-clock time (Unix seconds), so appends from several server runs stay on one
+timeline; load_recording() rebases it to the first request.
+"""
+import hashlib
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from typing import List, Optional
+
+from src.config.settings import AppSettings
+
+# PII scrubbing: the query text is kept (retrieval needs it) but identifiers are masked
+_SCRUBBERS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    (re.compile(r"https?://\S+"), "<url>"),
+    (re.compile(r"<[@#][!&]?\d+>"), "<mention>"),  # Discord user / channel / role mentions
+    (re.compile(r"\+?\d[\d\s().-]{7,}\d"), "<number>"),  # phone numbers, ids
+]
+
+
+def anonymize_query(query: str) -> str:
+    for pattern, replacement in _SCRUBBERS:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+def load_or_create_salt(path: str) -> str:
+    """
+    The session-hash salt lives next to the recording (`<path>.salt`), so the same session
+    hashes the same way across restarts and workers. Created once, readable by owner only.
+    """
+    salt_path = f"{path}.salt"
+    try:
+        fd = os.open(salt_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(salt_path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    salt = secrets.token_hex(16)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(salt)
+    return salt
+
+
+class TrafficRecorder:
+    """
+    Appends anonymized chat requests to a JSONL file. No-op when no path is configured.
+    record() is called from async endpoints, so it only enqueues: scrubbing, hashing and
+    file I/O happen on a background writer thread.
+    """
+
+    def __init__(
+        self,
+        path: str = AppSettings.TRAFFIC_RECORD_PATH,
+        salt: str = AppSettings.TRAFFIC_RECORD_SALT,
+    ):
+        self.path = path
+        self.salt = salt
+        self._queue: "queue.Queue[dict]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.salt = salt or load_or_create_salt(self.path)
+            print(f"🎙️  Recording traffic to: {self.path}")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _hash_session(self, session_id: str) -> str:
+        return hashlib.sha256(f"{self.salt}:{session_id}".encode("utf-8")).hexdigest()[:16]
+
+    def record(self, endpoint: str, request) -> None:
+        """`request` is a ChatRequest (query, session_id, priority and filter fields)."""
+        if not self.path:
+            return
+        self._ensure_writer()
+        self._queue.put_nowait(
+            {
+                "t": round(time.time(), 4),
+                "endpoint": endpoint,
+                "session": request.session_id,
+                "query": request.query,
+                "priority": request.priority,
+                "role": request.role,
+                "week": request.week,
+                "category": request.category,
+                "source_file": request.source_file,
+            }
+        )
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Blocks until every recorded request is on disk (tests, shutdown)."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._queue.put_nowait({"flush": done})
+        done.wait(timeout)
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="traffic-recorder", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                entry = self._queue.get()
+                if "flush" in entry:
+                    f.flush()
+                    entry["flush"].set()
+                    continue
+                entry["session"] = self._hash_session(entry["session"])
+                entry["query"] = anonymize_query(entry["query"])
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+
+def load_recording(path: str) -> List[dict]:
+    """
+    Loads a recording (JSONL from TrafficRecorder), sorted by arrival time and rebased so
+    the first request is at t=0.
+    A gold set (JSON list with "question" fields) also works: it becomes one
+    request per second, each question its own recorded session (the replay folds
+    them into its bounded session pool).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            gold = json.load(f)
+            return [
+                {"t": float(i), "endpoint": "chat", "session": f"gold-{i}", "query": item["question"]}
+                for i, item in enumerate(gold)
+            ]
+        records = [json.loads(line) for line in f if line.strip()]
+    records.sort(key=lambda r: r.get("t", 0.0))
+    if records:
+        t0 = records[0].get("t", 0.0)
+        records = [{**r, "t": r.get("t", 0.0) - t0} for r in records]
+    return records
+
+
+traffic_recorder = TrafficRecorder()
@@ -0,0 +1,221 @@
+# src/loadtest/replay.py
+"""
+Replays a recorded query stream against the API and reports latency / throughput / errors.
+
+    # Against a running server
+    python src/main.py replay traffic.jsonl --target http://localhost:8081 --qps 5
+
+    # Fully local: stub LLM + in-process Chroma + the API, all started by the replay
+    python src/main.py replay traffic.jsonl --local --qps 5 --concurrency 16
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+
+from src.utils.metrics import summarize
+
+# Client-side queueing above this (p95, seconds) means the replay itself is the bottleneck
+QUEUE_DELAY_WARN_SECONDS = 0.05
+
+
+class _ThreadedServer(uvicorn.Server):
+    """uvicorn in a background thread (signal handlers belong to the main thread)."""
+
+    def install_signal_handlers(self):
+        pass
+
+
+@contextmanager
+def serve_in_thread(app, port: int, host: str = "127.0.0.1"):
+    """Runs an ASGI app on host:port for the duration of the block. Yields its base URL."""
+    server = _ThreadedServer(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Server on port {port} failed to start")
+        time.sleep(0.05)
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def build_schedule(
+    records: List[dict], qps: Optional[float], speed: float, duration: Optional[float]
+) -> List[dict]:
+    """
+    Arrival times for the replay:
+    - qps set: evenly spaced at that rate, cycling through the recording for `duration`
+      seconds (or one pass if no duration).
+    - otherwise: the recorded timing, sped up by `speed`.
+    """
+    if not records:
+        return []
+    if qps:
+        count = int(qps * duration) if duration else len(records)
+        return [
+            {**records[i % len(records)], "at": i / qps}
+            for i in range(count)
+        ]
+    schedule = [{**r, "at": r.get("t", 0.0) / speed} for r in records]
+    if duration:
+        schedule = [r for r in schedule if r["at"] <= duration]
+    return schedule
+
+
+def session_slot(session: str, pool_size: int) -> int:
+    """Stable pool slot for a recorded session (same session -> same slot on every cycle)."""
+    return zlib.crc32(str(session).encode("utf-8")) % pool_size
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    base_url: str,
+    item: dict,
+    run_id: str,
+    pool_size: int,
+    scheduled: float,
+) -> dict:
+    """
+    Latency and TTFB are measured from `scheduled` (the intended arrival time, perf_counter),
+    not from when the request went out: time spent waiting for a client slot counts, otherwise
+    a slow server would hide its own queueing (coordinated omission).
+    """
+    slot = session_slot(item.get("session", "default"), pool_size)
+    payload = {
+        "query": item["query"],
+        # A bounded pool of session ids: recorded sessions stay together (chat memory matters),
+        # but a long replay doesn't create one server-side session per question or cycle.
+        # The run id keeps them apart from real sessions.
+        "session_id": f"replay-{run_id}-{slot}",
+        "priority": item.get("priority") or "interactive",
+    }
+    for key in ("role", "week", "category", "source_file"):
+        if item.get(key) is not None:
+            payload[key] = item[key]
+
+    endpoint = item.get("endpoint", "chat")
+    first_byte = None
+    try:
+        async with client.stream("POST", f"{base_url}/api/{endpoint}", json=payload) as response:
+            async for _ in response.aiter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - scheduled
+            status = response.status_code
+        error = None if status < 400 else f"HTTP {status}"
+    except httpx.HTTPError as e:
+        status, error = None, type(e).__name__
+    latency = time.perf_counter() - scheduled
+    return {
+        "status": status,
+        "error": error,
+        "latency": latency,
+        "ttfb": first_byte if first_byte is not None else latency,
+    }
+
+
+async def _replay(
+    schedule: List[dict], base_url: str, concurrency: int, timeout: float, sessions: int
+) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    run_id = uuid.uuid4().hex[:8]
+    results: List[dict] = []
+    queue_delays: List[float] = []
+
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        start = time.perf_counter()
+
+        async def fire(item: dict):
+            # Open loop: sleep until the scheduled arrival, then wait for a concurrency slot
+            scheduled = start + item["at"]
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            async with semaphore:
+                queue_delays.append(time.perf_counter() - scheduled)
+                results.append(await _send(client, base_url, item, run_id, sessions, scheduled))
+
+        await asyncio.gather(*(fire(item) for item in schedule))
+        wall = time.perf_counter() - start
+
+    return {"results": results, "queue_delays": queue_delays, "wall": wall}
+
+
+def run_replay(
+    records: List[dict],
+    base_url: str,
+    qps: Optional[float] = None,
+    concurrency: int = 8,
+    speed: float = 1.0,
+    duration: Optional[float] = None,
+    timeout: float = 300.0,
+    report_path: Optional[str] = None,
+    sessions: int = 32,
+) -> Dict[str, object]:
+    schedule = build_schedule(records, qps, speed, duration)
+    rate = f"{qps} QPS" if qps else f"recorded timing x{speed}"
+    print(
+        f"🔁 Replaying {len(schedule)} requests against {base_url} "
+        f"({rate}, concurrency {concurrency}, {sessions} sessions)..."
+    )
+
+    outcome = asyncio.run(_replay(schedule, base_url, concurrency, timeout, sessions))
+    results = outcome["results"]
+    ok = [r for r in results if r["error"] is None]
+    statuses = Counter(str(r["status"]) if r["status"] is not None else r["error"] for r in results)
+
+    report = {
+        "config": {
+            "target": base_url,
+            "qps": qps,
+            "speed": speed,
+            "concurrency": concurrency,
+            "sessions": sessions,
+            "duration": duration,
+        },
+        "requests": len(results),
+        "succeeded": len(ok),
+        "rejected_503": statuses.get("503", 0),
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "wall_seconds": outcome["wall"],
+        "throughput_rps": len(ok) / outcome["wall"] if outcome["wall"] else 0.0,
+        "latency": summarize(r["latency"] for r in ok),
+        "ttfb": summarize(r["ttfb"] for r in ok),
+        "client_queue_delay": summarize(outcome["queue_delays"]),
+        "status_codes": dict(statuses),
+    }
+
+    lat, ttfb, queued = report["latency"], report["ttfb"], report["client_queue_delay"]
+    print("\n📊 --- REPLAY REPORT ---")
+    print(
+        f"Requests:   {report['requests']} "
+        f"({report['succeeded']} ok, {report['rejected_503']} rejected 503)"
+    )
+    print(f"Error rate: {report['error_rate']:.1%} | Status codes: {report['status_codes']}")
+    print(f"Throughput: {report['throughput_rps']:.2f} req/s over {report['wall_seconds']:.1f}s")
+    print(f"Latency:    p50 {lat['p50']:.3f}s | p95 {lat['p95']:.3f}s | p99 {lat['p99']:.3f}s")
+    print(f"TTFB:       p50 {ttfb['p50']:.3f}s | p95 {ttfb['p95']:.3f}s | p99 {ttfb['p99']:.3f}s")
+    print(
+        f"Queued:     p50 {queued['p50']:.3f}s | p95 {queued['p95']:.3f}s | p99 {queued['p99']:.3f}s "
+        f"(client side, before sending)"
+    )
+    if queued["p95"] > QUEUE_DELAY_WARN_SECONDS:
+        print(
+            f"⚠️  Requests waited up to {queued['max']:.2f}s for a client slot before being sent: "
+            f"raise --concurrency so the replay keeps up with the schedule "
+            f"(latencies above include this wait)."
+        )
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to: {report_path} (compare between releases)")
+    return report
@@ -14,29 +14,54 @@ from fastapi import FastAPI
 from src.config.settings import AppSettings
 from src.indexing.bm25_indexer import build_bm25_index
 from src.indexing.chroma_indexer import ingest_to_chroma
+from src.loadtest.recorder import load_recording
+from src.loadtest.replay import run_replay, serve_in_thread
+from src.preprocessing.metadata import normalize_role
 from src.preprocessing.parsing import run_cleaning_pipeline
+from src.retrieval.evaluation import compare_dedup, evaluate_gold_set
+from src.retrieval.filters import RetrievalFilters
 from src.retrieval.retriever import HybridRAGRetriever
+from src.routes.admin import router as admin_router
 from src.routes.rag import router as rag_router
+from src.services.batch_service import BatchQAService
 from src.services.rag_service import RAGService
+from src.utils.stub_llm import create_stub_llm_app
+
+
+def create_app() -> FastAPI:
+    """The API application (used by 'serve' and by 'replay --local')."""
+    app = FastAPI(
+        title="Discord RAG Bot API",
+        description="API for querying the RAG system",
+        version="1.0.0",
+    )
+
+    # Register the router
+    app.include_router(rag_router, prefix="/api")
+    # Opt-in diagnostics: profiling + tracemalloc (disabled unless ADMIN_TOKEN is set)
+    app.include_router(admin_router, prefix="/api/admin")
+    return app
 
 
 def main():
     if len(sys.argv) < 2:
         print(
-            "Usage: python src/main.py [clean|ingest|build-bm25|search|chat|serve]"
+            "Usage: python src/main.py "
+            "[clean|ingest|build-bm25|search|eval|chat|batch|serve|stub-llm|replay]"
         )  # Added 'serve'
         return
 
-    # 👇 CHANGE 2: Use the register() pattern from your docs
-    # This automatically connects LlamaIndex to the Phoenix UI
-    tracer_provider = register(
-        project_name="discord-rag-bot",  # We give it a specific name
-        auto_instrument=True,  # This finds LlamaIndex automatically
-    )
+    if AppSettings.PHOENIX_ENABLED:
+        # 👇 CHANGE 2: Use the register() pattern from your docs
+        # This automatically connects LlamaIndex to the Phoenix UI
+        tracer_provider = register(
+            project_name="discord-rag-bot",  # We give it a specific name
+            auto_instrument=True,  # This finds LlamaIndex automatically
+        )
 
-    # Launch the UI (keeping your persistent storage setting)
-    session = px.launch_app(use_temp_dir=False)
-    print(f"🚀 Phoenix Tracing running at: {session.url}")
+        # Launch the UI (keeping your persistent storage setting)
+        session = px.launch_app(use_temp_dir=False)
+        print(f"🚀 Phoenix Tracing running at: {session.url}")
 
     command = sys.argv[1]
 
@@ -89,12 +114,22 @@ def main():
 
     # --- RETRIEVAL DEBUGGING (Keep this to test search quality separately) ---
     elif command == "search":
-        if len(sys.argv) < 3:
+        # Optional scope: python src/main.py search --role engineer --week 2 'My Question'
+        args = sys.argv[2:]
+        filters = RetrievalFilters()
+        while len(args) >= 2 and args[0] in ("--role", "--week"):
+            if args[0] == "--role":
+                filters.role = normalize_role(args[1])
+            else:
+                filters.week = int(args[1])
+            args = args[2:]
+
+        if not args:
             print("Please provide a query: python src/main.py search 'My Question'")
             return
-        query = " ".join(sys.argv[2:])
+        query = " ".join(args)
 
-        rag = HybridRAGRetriever()
+        rag = HybridRAGRetriever(filters=filters)
         results = rag.retrieve(query)
 
         for i, node in enumerate(results, 1):
@@ -103,23 +138,118 @@ def main():
             print(f"📄 Source: {source_file}")
             print(node.text[:200] + "...")
 
+    elif command == "eval":
+        # Retrieval recall on the gold set (current index), or before vs after dedup:
+        # python src/main.py eval --compare-dedup
+        if "--compare-dedup" in sys.argv[2:]:
+            compare_dedup()
+        else:
+            evaluate_gold_set()
+
+    elif command == "batch":
+        # python src/main.py batch questions.jsonl answers.jsonl [--in-flight 2] [--batch-size 32]
+        # Bypasses the API's admission control: raise --in-flight only when the bot is quiet.
+        args = sys.argv[2:]
+        options = {
+            "--in-flight": AppSettings.BATCH_MAX_IN_FLIGHT,
+            "--batch-size": AppSettings.BATCH_RETRIEVAL_SIZE,
+        }
+        paths = []
+        while args:
+            if args[0] in options and len(args) >= 2:
+                options[args[0]] = int(args[1])
+                args = args[2:]
+            else:
+                paths.append(args.pop(0))
+
+        if len(paths) != 2:
+            print(
+                "Usage: python src/main.py batch <questions.jsonl> <answers.jsonl> "
+                "[--in-flight N] [--batch-size N]"
+            )
+            return
+
+        print("📚 Starting Batch Question Answering...")
+        BatchQAService(
+            max_in_flight=options["--in-flight"], batch_size=options["--batch-size"]
+        ).run(paths[0], paths[1])
+
     elif command == "serve":
         print("🌐 Starting API Server...")
 
         # Define the FastAPI App
-        app = FastAPI(
-            title="Discord RAG Bot API",
-            description="API for querying the RAG system",
-            version="1.0.0",
-        )
-
-        # Register the router
-        app.include_router(rag_router, prefix="/api")
+        app = create_app()
 
         # Run with Uvicorn
         # Host 0.0.0.0 is crucial for Docker visibility
         uvicorn.run(app, host="0.0.0.0", port=8081)
 
+    elif command == "stub-llm":
+        # Fake vLLM for local load testing (no GPU needed)
+        print(
+            f"🧪 Starting Stub LLM on port {AppSettings.STUB_LLM_PORT} "
+            f"({AppSettings.STUB_LLM_TOKEN_RATE} tok/s, TTFT {AppSettings.STUB_LLM_TTFT}s)..."
+        )
+        uvicorn.run(
+            create_stub_llm_app(), host="0.0.0.0", port=AppSettings.STUB_LLM_PORT
+        )
+
+    elif command == "replay":
+        # python src/main.py replay traffic.jsonl [--target URL | --local] [--qps 5]
+        #   [--concurrency 8] [--sessions 32] [--speed 1] [--duration 60] [--report report.json]
+        args = sys.argv[2:]
+        local = "--local" in args
+        args = [a for a in args if a != "--local"]
+        options = {
+            "--target": "http://localhost:8081",
+            "--qps": None,
+            "--concurrency": "8",
+            "--sessions": "32",
+            "--speed": "1",
+            "--duration": None,
+            "--report": None,
+        }
+        paths = []
+        while args:
+            if args[0] in options and len(args) >= 2:
+                options[args[0]] = args[1]
+                args = args[2:]
+            else:
+                paths.append(args.pop(0))
+
+        if len(paths) != 1:
+            print(
+                "Usage: python src/main.py replay <traffic.jsonl | gold.json> "
+                "[--target URL | --local] [--qps N] [--concurrency N] [--sessions N] [--speed X] "
+                "[--duration S] [--report report.json]"
+            )
+            return
+
+        records = load_recording(paths[0])
+        replay_kwargs = dict(
+            qps=float(options["--qps"]) if options["--qps"] else None,
+            concurrency=int(options["--concurrency"]),
+            sessions=int(options["--sessions"]),
+            speed=float(options["--speed"]),
+            duration=float(options["--duration"]) if options["--duration"] else None,
+            report_path=options["--report"],
+        )
+
+        if not local:
+            run_replay(records, options["--target"], **replay_kwargs)
+            return
+
+        # Local stand-ins: stub LLM + in-process Chroma (run 'CHROMA_MODE=local ... ingest' once first)
+        AppSettings.CHROMA_MODE = "local"
+        print(
+            f"🧪 Local stack: stub LLM ({AppSettings.STUB_LLM_TOKEN_RATE} tok/s, "
+            f"TTFT {AppSettings.STUB_LLM_TTFT}s) + in-process Chroma at {AppSettings.CHROMA_LOCAL_PATH}"
+        )
+        with serve_in_thread(create_stub_llm_app(), AppSettings.STUB_LLM_PORT) as llm_url:
+            AppSettings.LLM_API_BASE = f"{llm_url}/v1"
+            with serve_in_thread(create_app(), 8081) as api_url:
+                run_replay(records, api_url, **replay_kwargs)
+
     else:
         print(f"Unknown command: {command}")
 
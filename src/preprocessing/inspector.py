@@ -5,6 +5,7 @@ from llama_index.core import SimpleDirectoryReader
 from llama_index.core.node_parser import MarkdownNodeParser
 
 from src.config.settings import AppSettings
+from src.preprocessing.metadata import NodeMetadataTagger
 
 
 def inspect_chunks(input_dir: str, output_csv: str):
@@ -19,6 +20,7 @@ def inspect_chunks(input_dir: str, output_csv: str):
     # This simulates exactly how the Indexer will chop up your text
     parser = MarkdownNodeParser(include_metadata=True)
     nodes = parser.get_nodes_from_documents(documents)
+    nodes = NodeMetadataTagger()(nodes)
 
     print(f"✂️  Parsed into {len(nodes)} chunks.")
 
@@ -30,6 +32,10 @@ def inspect_chunks(input_dir: str, output_csv: str):
                 "File Name": node.metadata.get("file_name", "Unknown"),
                 # This captures the # Header > ## Subheader path
                 "Header Path": node.metadata.get("header_path", "None"),
+                # Filter metadata used by retrieval (check role/week detection here)
+                "Role": node.metadata.get("role"),
+                "Week": node.metadata.get("week"),
+                "Category": node.metadata.get("category"),
                 "Character Count": len(node.text),
                 # Preview the text to ensure it looks clean
                 "Content Preview": node.text[:100].replace("\n", " ") + "...",
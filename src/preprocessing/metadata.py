@@ -0,0 +1,123 @@
+import re
+from typing import List, Optional, Set
+
+from llama_index.core.schema import BaseNode, TransformComponent
+
+# Canonical role -> keywords found in silver role markers (e.g. "* **Software Engineers**")
+ROLE_KEYWORDS = {
+    "engineer": ["engineer"],
+    "designer": ["designer"],
+    "pm": ["product manager", "manager"],
+    "data_scientist": ["data scientist"],
+}
+ALL_ROLES = "all"
+
+# Structured fields stored with every node (Chroma only accepts scalar metadata values)
+METADATA_KEYS = ["role", "week", "category", "source_file"]
+
+# Fields a chunk can belong to several values of (after dedup merges chunks from different
+# weeks / files). Each value also gets a boolean flag ("week_3": True) and filters match on the flag.
+MEMBERSHIP_FIELDS = ["week", "category", "source_file"]
+
+_ROLE_MARKER_PATTERN = re.compile(r"(?m)^\s*\*\s+\*\*(.+?)\*\*")
+_WEEK_PATTERN = re.compile(r"week[\s_\-]*(\d{1,2})", re.IGNORECASE)
+
+
+def detect_roles(text: str) -> Set[str]:
+    """Returns the canonical roles mentioned in a piece of text."""
+    clean = text.lower()
+    roles = set()
+    for role, keywords in ROLE_KEYWORDS.items():
+        if any(k in clean for k in keywords):
+            roles.add(role)
+    return roles
+
+
+def detect_week(*texts: str) -> int:
+    """First week number found in the given texts (0 = not week-specific)."""
+    for text in texts:
+        match = _WEEK_PATTERN.search(text or "")
+        if match:
+            return int(match.group(1))
+    return 0
+
+
+def detect_category(file_name: str, header_path: str, text: str, week: int) -> str:
+    context = f"{file_name} {header_path}".lower()
+    if "onboard" in context or "welcome" in context:
+        return "onboarding"
+    if week:
+        return "week"
+    if "resource" in context or "playlist" in context or text.count("http") >= 3:
+        return "resources"
+    return "general"
+
+
+def membership_key(field: str, value) -> str:
+    """Metadata key of the boolean flag for one value of a multi-valued field (e.g. "week_3")."""
+    return f"{field}_{value}"
+
+
+def is_membership_key(key: str) -> bool:
+    return any(key.startswith(f"{field}_") for field in MEMBERSHIP_FIELDS)
+
+
+def filter_metadata_keys(metadata: dict) -> List[str]:
+    """Every metadata key used for filtering: the scalar fields plus the membership flags."""
+    return [key for key in metadata if key in METADATA_KEYS or is_membership_key(key)]
+
+
+def exclude_from_prompts(node: BaseNode, keys: List[str]):
+    """Filter/provenance fields are for retrieval only: keep them out of the embedding text and the LLM prompt."""
+    for key in keys:
+        if key not in node.excluded_embed_metadata_keys:
+            node.excluded_embed_metadata_keys.append(key)
+        if key not in node.excluded_llm_metadata_keys:
+            node.excluded_llm_metadata_keys.append(key)
+
+
+def extract_node_metadata(node: BaseNode) -> dict:
+    """Role / week / category / source file for one chunk."""
+    text = node.get_content()
+    file_name = node.metadata.get("file_name", "")
+    header_path = node.metadata.get("header_path", "")
+
+    # 1. Role: headers win (the whole section is role-specific), then the role markers inside the chunk.
+    #    A chunk that covers several roles (or none) applies to everyone.
+    roles = detect_roles(header_path)
+    if not roles:
+        markers = " | ".join(_ROLE_MARKER_PATTERN.findall(text))
+        roles = detect_roles(markers)
+    role = roles.pop() if len(roles) == 1 else ALL_ROLES
+
+    # 2. Week: file name first (e.g. "SILVER_Week 3 Agenda.md"), then section headers
+    week = detect_week(file_name, header_path)
+
+    metadata = {
+        "role": role,
+        "week": week,
+        "category": detect_category(file_name, header_path, text, week),
+        "source_file": file_name,
+    }
+    metadata.update({membership_key(field, metadata[field]): True for field in MEMBERSHIP_FIELDS})
+    return metadata
+
+
+class NodeMetadataTagger(TransformComponent):
+    """Stores structured filter metadata on every node at chunking time."""
+
+    def __call__(self, nodes: List[BaseNode], **kwargs) -> List[BaseNode]:
+        for node in nodes:
+            node.metadata.update(extract_node_metadata(node))
+            exclude_from_prompts(node, filter_metadata_keys(node.metadata))
+        return nodes
+
+
+def normalize_role(role: Optional[str]) -> Optional[str]:
+    """Maps free-form role names (e.g. a Discord role "Data Scientists") to a canonical role."""
+    if not role:
+        return None
+    if role in ROLE_KEYWORDS or role == ALL_ROLES:
+        return role
+    roles = detect_roles(role)
+    return roles.pop() if len(roles) == 1 else None
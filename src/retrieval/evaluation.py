@@ -0,0 +1,115 @@
+import copy
+import json
+import re
+from typing import List, Optional
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import NodeWithScore
+
+from src.config.settings import AppSettings, setup_global_settings
+from src.indexing.bm25_indexer import load_tagged_nodes
+from src.indexing.dedup import dedupe_nodes
+from src.retrieval.retriever import HybridRAGRetriever
+
+_URL_PATTERN = re.compile(r"https?://[^\s)\]>]+")
+
+
+def _answer_terms(answer: str) -> set:
+    """Content words of a gold answer (URLs removed, short words skipped)."""
+    text = _URL_PATTERN.sub(" ", answer.lower())
+    return {w for w in re.findall(r"\w+", text) if len(w) > 3}
+
+
+def score_retrieval(answer: str, nodes: List[NodeWithScore]) -> dict:
+    """
+    Recall of one gold answer inside the retrieved chunks:
+    - url_recall:  share of the answer's URLs present in the chunks (None if it has no URLs)
+    - term_recall: share of the answer's content words present in the chunks
+    """
+    retrieved = " ".join(n.node.get_content() for n in nodes).lower()
+    urls = {u.rstrip(".,").lower() for u in _URL_PATTERN.findall(answer)}
+    terms = _answer_terms(answer)
+    retrieved_terms = set(re.findall(r"\w+", retrieved))
+
+    return {
+        "url_recall": (sum(u in retrieved for u in urls) / len(urls)) if urls else None,
+        "term_recall": (len(terms & retrieved_terms) / len(terms)) if terms else 1.0,
+    }
+
+
+def evaluate_gold_set(
+    gold_path: str = AppSettings.GOLD_SET_PATH,
+    top_k: int = 3,
+    retriever: Optional[HybridRAGRetriever] = None,
+) -> dict:
+    """
+    Runs every gold question through the hybrid retriever and averages the recall scores.
+    Uses retrieve(), the same path the chat engine takes for /api/chat.
+    """
+    with open(gold_path, "r", encoding="utf-8") as f:
+        gold = json.load(f)
+    if retriever is None:
+        retriever = HybridRAGRetriever(top_k=top_k, verbose=False)
+
+    url_scores, term_scores = [], []
+    print(f"\n🧪 Retrieval recall on {len(gold)} gold questions (top_k={top_k}):")
+    for item in gold:
+        nodes = retriever.retrieve(item["question"])
+        scores = score_retrieval(item["answer"], nodes)
+        term_scores.append(scores["term_recall"])
+        url_text = "  n/a"
+        if scores["url_recall"] is not None:
+            url_scores.append(scores["url_recall"])
+            url_text = f"{scores['url_recall']:.2f}"
+        print(
+            f"   #{item.get('id', '?'):<3} URLs: {url_text} | Terms: {scores['term_recall']:.2f} | "
+            f"{item['question'][:60]}"
+        )
+
+    report = {
+        "questions": len(gold),
+        "url_recall": sum(url_scores) / len(url_scores) if url_scores else None,
+        "term_recall": sum(term_scores) / len(term_scores) if term_scores else 0.0,
+    }
+    print("─" * 60)
+    if report["url_recall"] is not None:
+        print(f"📊 Mean URL recall:  {report['url_recall']:.3f} ({len(url_scores)} questions with URLs)")
+    print(f"📊 Mean term recall: {report['term_recall']:.3f}")
+    return report
+
+
+def compare_dedup(gold_path: str = AppSettings.GOLD_SET_PATH, top_k: int = 3) -> Optional[dict]:
+    """
+    Gold-set recall before vs after near-duplicate collapsing, on the same silver data.
+    Both node sets are embedded into in-memory indexes, so Chroma and the saved nodes are untouched.
+    """
+    nodes = load_tagged_nodes()
+    if not nodes:
+        print("❌ No silver data to evaluate. Run 'python src/main.py clean' first.")
+        return None
+
+    setup_global_settings()
+    # dedupe_nodes() merges metadata into the canonical nodes: keep the "before" set pristine
+    deduped, dedup_report = dedupe_nodes(copy.deepcopy(nodes), threshold=AppSettings.DEDUP_THRESHOLD)
+
+    reports = {}
+    for label, variant in (("before", nodes), ("after", deduped)):
+        print(f"\n🧬 {label.title()} dedup: embedding {len(variant)} nodes in memory...")
+        retriever = HybridRAGRetriever(
+            top_k=top_k,
+            verbose=False,
+            nodes=variant,
+            vector_index=VectorStoreIndex(variant, show_progress=False),
+        )
+        reports[label] = evaluate_gold_set(gold_path, top_k, retriever=retriever)
+
+    before, after = reports["before"], reports["after"]
+    print("\n📊 --- DEDUP RECALL COMPARISON ---")
+    print(
+        f"Nodes:        {dedup_report['nodes_before']} -> {dedup_report['nodes_after']} "
+        f"({dedup_report['embedding_savings']:.0%} less text to embed)"
+    )
+    print(f"Term recall:  {before['term_recall']:.3f} -> {after['term_recall']:.3f}")
+    if before["url_recall"] is not None:
+        print(f"URL recall:   {before['url_recall']:.3f} -> {after['url_recall']:.3f}")
+    return {"dedup": dedup_report, "before": before, "after": after}
@@ -0,0 +1,116 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from llama_index.core.schema import BaseNode
+
+from src.preprocessing.metadata import (
+    ALL_ROLES,
+    MEMBERSHIP_FIELDS,
+    METADATA_KEYS,
+    filter_metadata_keys,
+    membership_key,
+)
+
+
+@dataclass
+class RetrievalFilters:
+    """
+    Structured metadata filters for hybrid retrieval.
+    `role` also matches chunks tagged "all" (shared material applies to every role).
+    `week`, `category` and `source_file` match the membership flags, so merged chunks
+    match every source.
+    """
+
+    role: Optional[str] = None
+    week: Optional[int] = None
+    category: Optional[str] = None
+    source_file: Optional[str] = None
+
+    def is_empty(self) -> bool:
+        return all(getattr(self, key) is None for key in METADATA_KEYS)
+
+    def allowed_values(self) -> Dict[str, list]:
+        """metadata key -> list of accepted values (OR inside a key, AND across keys)."""
+        allowed = {}
+        if self.role is not None:
+            allowed["role"] = [self.role] if self.role == ALL_ROLES else [self.role, ALL_ROLES]
+        for field in MEMBERSHIP_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                value = int(value) if field == "week" else value
+                allowed[membership_key(field, value)] = [True]
+        return allowed
+
+    def to_chroma_where(self) -> Optional[dict]:
+        """Chroma `where` clause for the vector side (None = no filtering)."""
+        clauses = []
+        for key, values in self.allowed_values().items():
+            if len(values) == 1:
+                clauses.append({key: values[0]})
+            else:
+                clauses.append({key: {"$in": values}})
+
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+
+class MetadataBitmaps:
+    """
+    Precomputed per-value document bitmaps over the BM25 corpus.
+    Built once at load time so a filter resolves to its candidate mask with a few
+    vectorised OR/AND operations instead of a scan over every node's metadata.
+    """
+
+    def __init__(self, nodes: List[BaseNode]):
+        self.size = len(nodes)
+        self.bitmaps: Dict[str, Dict[object, np.ndarray]] = {key: {} for key in METADATA_KEYS}
+
+        for position, node in enumerate(nodes):
+            for key in filter_metadata_keys(node.metadata):
+                value = node.metadata[key]
+                if value is None:
+                    continue
+                bitmap = self.bitmaps.setdefault(key, {}).get(value)
+                if bitmap is None:
+                    bitmap = np.zeros(self.size, dtype=bool)
+                    self.bitmaps[key][value] = bitmap
+                bitmap[position] = True
+
+    def mask(self, filters: RetrievalFilters) -> np.ndarray:
+        """Boolean mask over the node list: True for every document that passes the filters."""
+        mask = np.ones(self.size, dtype=bool)
+        for key, values in filters.allowed_values().items():
+            field_mask = np.zeros(self.size, dtype=bool)
+            for value in values:
+                bitmap = self.bitmaps.get(key, {}).get(value)
+                if bitmap is not None:
+                    field_mask |= bitmap
+            mask &= field_mask
+        return mask
+
+
+# Filters of the request being served. A context variable (not retriever state) so that
+# concurrent requests sharing one retriever or session never see each other's scope.
+_request_filters: ContextVar[Optional[RetrievalFilters]] = ContextVar(
+    "request_filters", default=None
+)
+
+
+@contextmanager
+def filters_scope(filters: Optional[RetrievalFilters]):
+    """Applies `filters` to every retrieval made inside the block (in this thread / task)."""
+    token = _request_filters.set(filters)
+    try:
+        yield
+    finally:
+        _request_filters.reset(token)
+
+
+def current_filters() -> Optional[RetrievalFilters]:
+    return _request_filters.get()
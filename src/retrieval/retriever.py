@@ -1,15 +1,40 @@
 import os
 import pickle
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-import chromadb
-from llama_index.core import VectorStoreIndex
+import bm25s
+import numpy as np
+import Stemmer
+from llama_index.core import Settings, VectorStoreIndex
 from llama_index.core.retrievers import BaseRetriever
-from llama_index.core.schema import NodeWithScore, QueryBundle
-from llama_index.retrievers.bm25 import BM25Retriever
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore, QueryBundle
 from llama_index.vector_stores.chroma import ChromaVectorStore
 
 from src.config.settings import AppSettings, setup_global_settings
+from src.retrieval.filters import MetadataBitmaps, RetrievalFilters, current_filters
+
+# BM25 tokenization (the same scheme llama-index's BM25Retriever uses): words of 2+ characters,
+# English stemming, English stopwords removed from the corpus
+BM25_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+
+def _bm25_tokenize(texts: List[str], stopwords: Optional[str] = None):
+    # A fresh stemmer per call: PyStemmer objects must not be shared between threads
+    return bm25s.tokenize(
+        texts,
+        stopwords=stopwords,
+        stemmer=Stemmer.Stemmer("english"),
+        token_pattern=BM25_TOKEN_PATTERN,
+        show_progress=False,
+    )
+
+
+def build_bm25(nodes: List[BaseNode]) -> bm25s.BM25:
+    """BM25 index over the nodes; result positions are positions in `nodes`."""
+    bm25 = bm25s.BM25()
+    corpus = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+    bm25.index(_bm25_tokenize(corpus, stopwords="en"), show_progress=False)
+    return bm25
 
 
 class HybridRAGRetriever(BaseRetriever):
@@ -17,41 +42,145 @@ class HybridRAGRetriever(BaseRetriever):
     Custom Hybrid Retriever that combines:
     1. Vector Search (Semantic) - Weight: 5.0
     2. BM25 Search (Keyword)  - Weight: 3.0
+
+    Optional metadata filters (role / week / category / source file) narrow both sides
+    before scoring: a Chroma `where` clause for vectors, precomputed bitmaps for BM25.
+    Filters are per call: pass them to retrieve_batch(), or wrap a chat-engine call in
+    filters_scope(). The constructor's `filters` only act as the default scope.
     """
 
-    def __init__(self, top_k: int = 3):
-        setup_global_settings()
+    def __init__(
+        self,
+        top_k: int = 3,
+        filters: Optional[RetrievalFilters] = None,
+        verbose: bool = True,
+        nodes: Optional[List[BaseNode]] = None,
+        vector_index: Optional[VectorStoreIndex] = None,
+    ):
+        """
+        By default the index built by 'build-bm25' + 'ingest' is loaded (pickled nodes + Chroma).
+        `nodes` / `vector_index` let evaluation compare other node sets in memory
+        (the embedding model must already be set up by the caller).
+        """
         self.top_k = top_k
+        self.filters = filters
+        self.verbose = verbose  # Per-query [DEBUG] score breakdowns
 
         # --- 1. Setup Vector Retriever (ChromaDB) ---
-        self.client = chromadb.HttpClient(
-            host=AppSettings.CHROMA_HOST, port=AppSettings.CHROMA_PORT
-        )
-        self.collection = self.client.get_or_create_collection(
-            AppSettings.COLLECTION_NAME
-        )
-        self.vector_store = ChromaVectorStore(chroma_collection=self.collection)
-        self.vector_index = VectorStoreIndex.from_vector_store(self.vector_store)
+        if vector_index is None:
+            setup_global_settings()
+            self.client = AppSettings.get_chroma_client()
+            self.collection = self.client.get_or_create_collection(
+                AppSettings.COLLECTION_NAME
+            )
+            self.vector_store = ChromaVectorStore(chroma_collection=self.collection)
+            vector_index = VectorStoreIndex.from_vector_store(self.vector_store)
+        self.vector_index = vector_index
         self.vector_retriever = self.vector_index.as_retriever(similarity_top_k=top_k)
 
         # --- 2. Setup BM25 Retriever (Load Nodes & Rebuild) ---
-        print("💾 Loading Pre-Parsed Nodes from disk...")
+        if nodes is None:
+            print("💾 Loading Pre-Parsed Nodes from disk...")
 
-        if not os.path.exists(AppSettings.NODES_INDEX_PATH):
-            raise FileNotFoundError(
-                f"❌ Nodes file not found at {AppSettings.NODES_INDEX_PATH}. "
-                "Please run 'python src/main.py build-bm25' first."
-            )
+            if not os.path.exists(AppSettings.NODES_INDEX_PATH):
+                raise FileNotFoundError(
+                    f"❌ Nodes file not found at {AppSettings.NODES_INDEX_PATH}. "
+                    "Please run 'python src/main.py build-bm25' first."
+                )
 
-        with open(AppSettings.NODES_INDEX_PATH, "rb") as f:
-            nodes = pickle.load(f)
+            with open(AppSettings.NODES_INDEX_PATH, "rb") as f:
+                nodes = pickle.load(f)
+        self.nodes = nodes
 
         # Rebuilding BM25 from nodes is extremely fast (sub-second)
-        self.bm25_retriever = BM25Retriever.from_defaults(
-            nodes=nodes, similarity_top_k=top_k
-        )
+        self.bm25 = build_bm25(nodes)
+
+        # --- 3. Filter bitmaps (same node order as the BM25 corpus) ---
+        # A filtered search masks the scores of the BM25 index above, so filtered and
+        # unfiltered searches rank with the same index and tokenizer.
+        self.bitmaps = MetadataBitmaps(nodes)
         print(f"✅ BM25 Index Ready ({len(nodes)} nodes loaded).")
 
+    def _active_filters(
+        self, filters: Optional[RetrievalFilters] = None
+    ) -> Optional[RetrievalFilters]:
+        """Explicit filters, else the request's (filters_scope), else the constructor default."""
+        if filters is not None:
+            return filters
+        scoped = current_filters()
+        return scoped if scoped is not None else self.filters
+
+    def _get_vector_retriever(self, filters: Optional[RetrievalFilters]):
+        """The shared vector retriever, or a filtered one that sends a Chroma `where` clause."""
+        if filters is None or filters.is_empty():
+            return self.vector_retriever
+        return self.vector_index.as_retriever(
+            similarity_top_k=self.top_k,
+            vector_store_kwargs={"where": filters.to_chroma_where()},
+        )
+
+    def _bm25_node(self, position: int, score: float) -> NodeWithScore:
+        # Fusion writes score details into node metadata: give each result its own copy
+        node = self.nodes[position]
+        return NodeWithScore(
+            node=node.model_copy(update={"metadata": dict(node.metadata)}), score=score
+        )
+
+    def _bm25_retrieve(
+        self, queries: List[str], filters: Optional[RetrievalFilters]
+    ) -> List[List[NodeWithScore]]:
+        """
+        BM25 for one or many queries (bm25s scores the whole batch in one call).
+        Filters become a weight mask over the corpus, built from the precomputed bitmaps,
+        so documents outside the scope score 0 and are dropped.
+        """
+        weight_mask = None
+        if filters is not None and not filters.is_empty():
+            mask = self.bitmaps.mask(filters)
+            if not mask.any():
+                return [[] for _ in queries]
+            weight_mask = mask.astype(np.float32)
+
+        positions, scores = self.bm25.retrieve(
+            _bm25_tokenize(queries),
+            k=min(self.top_k, len(self.nodes)),
+            weight_mask=weight_mask,
+            show_progress=False,
+        )
+        return [
+            [
+                self._bm25_node(int(position), float(score))
+                for position, score in zip(row_positions, row_scores)
+                if score > 0
+            ]
+            for row_positions, row_scores in zip(positions, scores)
+        ]
+
+    def retrieve_batch(
+        self, queries: List[str], filters: Optional[RetrievalFilters] = None
+    ) -> List[List[NodeWithScore]]:
+        """
+        Hybrid retrieval for many queries: one batched embedding call for all of them,
+        one batched BM25 call, then the usual per-query fusion.
+        """
+        if not queries:
+            return []
+        filters = self._active_filters(filters)
+
+        # bge-m3 uses no query instruction, so a text batch embedding equals the query embedding
+        embeddings = Settings.embed_model.get_text_embedding_batch(queries)
+        bm25_batch = self._bm25_retrieve(queries, filters)
+
+        vector_retriever = self._get_vector_retriever(filters)
+
+        results = []
+        for query, embedding, bm25_nodes in zip(queries, embeddings, bm25_batch):
+            vector_nodes = vector_retriever.retrieve(
+                QueryBundle(query_str=query, embedding=embedding)
+            )
+            results.append(self._fuse(query, vector_nodes, bm25_nodes, filters))
+        return results
+
     def _normalize_scores(
         self, node_list: List[NodeWithScore]
     ) -> Dict[str, NodeWithScore]:
@@ -74,24 +203,38 @@ class HybridRAGRetriever(BaseRetriever):
         return normalized_nodes
 
     def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
-        query = query_bundle.query_str
-
         # 1. Get results from both retrievers
-        vector_nodes = self.vector_retriever.retrieve(query)
-        bm25_nodes = self.bm25_retriever.retrieve(query)
-
-        # --- ENHANCED DEBUG PRINTS (Start) ---
-        print(f"\n🔍 [DEBUG] Query: '{query}'")
-        print(f"   - Vector Candidates: {len(vector_nodes)}")
-        if vector_nodes:
-            raw_vector_scores = [f"{n.score:.4f}" for n in vector_nodes]
-            print(f"     Raw scores: {', '.join(raw_vector_scores)}")
-
-        print(f"   - BM25 Candidates:   {len(bm25_nodes)}")
-        if bm25_nodes:
-            raw_bm25_scores = [f"{n.score:.4f}" for n in bm25_nodes]
-            print(f"     Raw scores: {', '.join(raw_bm25_scores)}")
-        # --- DEBUG PRINTS (End) ---
+        # (the bundle is passed through so a precomputed query embedding is reused)
+        filters = self._active_filters()
+        vector_nodes = self._get_vector_retriever(filters).retrieve(query_bundle)
+        bm25_nodes = self._bm25_retrieve([query_bundle.query_str], filters)[0]
+
+        return self._fuse(query_bundle.query_str, vector_nodes, bm25_nodes, filters)
+
+    def _fuse(
+        self,
+        query: str,
+        vector_nodes: List[NodeWithScore],
+        bm25_nodes: List[NodeWithScore],
+        filters: Optional[RetrievalFilters] = None,
+    ) -> List[NodeWithScore]:
+        """Normalizes both candidate lists and merges them with the hybrid weights."""
+
+        if self.verbose:
+            # --- ENHANCED DEBUG PRINTS (Start) ---
+            print(f"\n🔍 [DEBUG] Query: '{query}'")
+            if filters is not None and not filters.is_empty():
+                print(f"   - Filters: {filters.allowed_values()}")
+            print(f"   - Vector Candidates: {len(vector_nodes)}")
+            if vector_nodes:
+                raw_vector_scores = [f"{n.score:.4f}" for n in vector_nodes]
+                print(f"     Raw scores: {', '.join(raw_vector_scores)}")
+
+            print(f"   - BM25 Candidates:   {len(bm25_nodes)}")
+            if bm25_nodes:
+                raw_bm25_scores = [f"{n.score:.4f}" for n in bm25_nodes]
+                print(f"     Raw scores: {', '.join(raw_bm25_scores)}")
+            # --- DEBUG PRINTS (End) ---
 
         # Store original scores for debugging before normalization
         original_vector_scores = {n.node.node_id: n.score for n in vector_nodes}
@@ -106,7 +249,7 @@ class HybridRAGRetriever(BaseRetriever):
         final_results = []
 
         # --- DEBUG: Show component scores for all nodes ---
-        if all_ids:
+        if self.verbose and all_ids:
             print(f"\n📊 [DEBUG] Component Scores (normalized 0-1):")
             for node_id in all_ids:
                 node_obj = norm_vector.get(node_id) or norm_bm25.get(node_id)
@@ -167,29 +310,30 @@ class HybridRAGRetriever(BaseRetriever):
         final_results.sort(key=lambda x: x.score, reverse=True)
         top_results = final_results[: self.top_k]
 
-        # --- ENHANCED DEBUG PRINTS (Final Results) ---
-        print(f"\n🏆 [DEBUG] Top {len(top_results)} Final Results:")
-        for i, node in enumerate(top_results, 1):
-            file_name = node.metadata.get("file_name", "Unknown")
-            v_raw = node.metadata.get("vector_raw_score", 0.0)
-            b_raw = node.metadata.get("bm25_raw_score", 0.0)
-            v_norm = node.metadata.get("vector_norm_score", 0.0)
-            b_norm = node.metadata.get("bm25_norm_score", 0.0)
-            w_v = node.metadata.get("vector_weight", 5.0)
-            w_b = node.metadata.get("bm25_weight", 3.0)
-
-            print(f"   {i}. {file_name}")
-            print(f"      Final Score: {node.score:.4f}")
-            print(
-                f"      Vector: {v_raw:.4f} → {v_norm:.4f} (×{w_v:.1f} = {v_norm * w_v:.4f})"
-            )
-            print(
-                f"      BM25:   {b_raw:.4f} → {b_norm:.4f} (×{w_b:.1f} = {b_norm * w_b:.4f})"
-            )
-            print(f"      Preview: {node.text[:80].replace(chr(10), ' ')}...")
-            if i < len(top_results):  # Add separator between results
-                print(f"      {'─'*60}")
-        print("─" * 60)
+        if self.verbose:
+            # --- ENHANCED DEBUG PRINTS (Final Results) ---
+            print(f"\n🏆 [DEBUG] Top {len(top_results)} Final Results:")
+            for i, node in enumerate(top_results, 1):
+                file_name = node.metadata.get("file_name", "Unknown")
+                v_raw = node.metadata.get("vector_raw_score", 0.0)
+                b_raw = node.metadata.get("bm25_raw_score", 0.0)
+                v_norm = node.metadata.get("vector_norm_score", 0.0)
+                b_norm = node.metadata.get("bm25_norm_score", 0.0)
+                w_v = node.metadata.get("vector_weight", 5.0)
+                w_b = node.metadata.get("bm25_weight", 3.0)
+
+                print(f"   {i}. {file_name}")
+                print(f"      Final Score: {node.score:.4f}")
+                print(
+                    f"      Vector: {v_raw:.4f} → {v_norm:.4f} (×{w_v:.1f} = {v_norm * w_v:.4f})"
+                )
+                print(
+                    f"      BM25:   {b_raw:.4f} → {b_norm:.4f} (×{w_b:.1f} = {b_norm * w_b:.4f})"
+                )
+                print(f"      Preview: {node.text[:80].replace(chr(10), ' ')}...")
+                if i < len(top_results):  # Add separator between results
+                    print(f"      {'─'*60}")
+            print("─" * 60)
 
         return top_results
 
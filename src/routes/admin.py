@@ -0,0 +1,83 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from src.config.settings import AppSettings
+from src.routes.rag import _sessions_lock, sessions
+from src.utils.profiling import memory_tracker, profiler
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    The server binds 0.0.0.0 and these endpoints expose stacks and heap contents,
+    so they stay disabled (403) until ADMIN_TOKEN is set.
+    """
+    if not AppSettings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: set ADMIN_TOKEN")
+    if not AppSettings.is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+# --- 1. SAMPLING PROFILER ---
+class ProfileRequest(BaseModel):
+    requests: int = 1  # profile the next N chat requests (0 = disarm)
+
+
+@router.post("/profile")
+async def arm_profiler(request: ProfileRequest):
+    return {"armed": profiler.arm(request.requests)}
+
+
+@router.get("/profiles")
+async def list_profiles():
+    return {"armed": profiler.armed(), "profiles": profiler.list_profiles()}
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """Folded stacks: feed to flamegraph.pl, speedscope or inferno."""
+    session = profiler.get_profile(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return session.folded()
+
+
+# --- 2. MEMORY (tracemalloc) ---
+def cache_stats() -> dict:
+    """Sizes of the in-process caches most likely to leak."""
+    with _sessions_lock:
+        services = list(sessions.values())
+    retrievers = {id(s.retriever): s.retriever for s in services}
+    return {
+        "sessions": len(services),
+        "memory_messages": sum(s.memory.message_count() for s in services),
+        "retrievers": len(retrievers),
+        "retriever_nodes": sum(len(r.nodes) for r in retrievers.values()),
+    }
+
+
+@router.post("/memory/start")
+async def start_tracemalloc():
+    return memory_tracker.start()
+
+
+@router.post("/memory/snapshot")
+def take_snapshot(limit: int = 25, group_by: str = "lineno"):
+    """Top allocations + growth since the previous snapshot. Call twice around a load test."""
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    try:
+        result = memory_tracker.snapshot(limit=limit, group_by=group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {**result, "caches": cache_stats()}
+
+
+@router.post("/memory/stop")
+async def stop_tracemalloc():
+    return memory_tracker.stop()
@@ -1,46 +1,172 @@
 import json
-from typing import Dict, List
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Literal, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from src.config.settings import AppSettings
+from src.loadtest.recorder import traffic_recorder
+from src.preprocessing.metadata import normalize_role
+from src.retrieval.filters import RetrievalFilters
+from src.retrieval.retriever import HybridRAGRetriever
+from src.services.admission import AdmissionRejected, admission_controller
 from src.services.rag_service import RAGService
+from src.utils.profiling import profiled, profiled_iter, profiler
 
 router = APIRouter()
 
 # --- 1. SESSION MANAGER ---
-# This dictionary will hold one RAGService instance per user/session.
-# In production, you'd use Redis or a database, but this works for a single Docker container.
-sessions: Dict[str, RAGService] = {}
+# This dictionary will hold one RAGService instance per user/session (least recently used first,
+# capped at MAX_SESSIONS). In production, you'd use Redis or a database, but this works for a
+# single Docker container.
+sessions: "OrderedDict[str, RAGService]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+# Retriever (embedding model, BM25 index, Chroma client) and LLM client shared by every session:
+# retrieval keeps no per-request state, only the chat memory belongs to a session.
+_shared: Dict[str, object] = {}
+
+
+# Last request time per session, used to compress the history of idle sessions
+last_seen: Dict[str, float] = {}
+_last_sweep = 0.0
+
+
+def compact_idle_sessions():
+    """
+    Compresses the chat memory of sessions idle for SESSION_IDLE_COMPACT_SECONDS
+    (at most once a minute; caller holds _sessions_lock).
+    """
+    global _last_sweep
+    now = time.monotonic()
+    if now - _last_sweep < 60:
+        return
+    _last_sweep = now
+    for session_id, seen in list(last_seen.items()):
+        if now - seen > AppSettings.SESSION_IDLE_COMPACT_SECONDS and session_id in sessions:
+            sessions[session_id].memory.compact()
+
+
+def get_shared_components():
+    """The process-wide retriever and LLM client, built on first use (caller holds _sessions_lock)."""
+    if not _shared:
+        _shared["retriever"] = HybridRAGRetriever(top_k=3)
+        _shared["llm"] = AppSettings.get_llm()
+    return _shared["retriever"], _shared["llm"]
 
 
 def get_service_for_session(session_id: str) -> RAGService:
     """Gets an existing service for a user or creates a new one."""
-    if session_id not in sessions:
+    with _sessions_lock:
+        compact_idle_sessions()
+        last_seen[session_id] = time.monotonic()
+        if session_id in sessions:
+            sessions.move_to_end(session_id)
+            return sessions[session_id]
+
         print(f"✨ Creating new RAG session for ID: {session_id}")
         try:
             # Initialize a fresh service (with fresh memory) for this user
-            sessions[session_id] = RAGService()
+            retriever, llm = get_shared_components()
+            sessions[session_id] = RAGService(retriever=retriever, llm=llm)
         except Exception as e:
             print(f"❌ Error creating service: {e}")
             raise HTTPException(
                 status_code=500, detail="Failed to initialize RAG service"
             )
-    return sessions[session_id]
+
+        while len(sessions) > AppSettings.MAX_SESSIONS:
+            evicted, _ = sessions.popitem(last=False)
+            last_seen.pop(evicted, None)
+        return sessions[session_id]
 
 
 # --- 2. DATA MODELS ---
 class ChatRequest(BaseModel):
     query: str
     session_id: str = "default"  # Default allows testing without an ID
+    # Interactive Discord questions are served before batch/benchmark traffic
+    priority: Literal["interactive", "batch"] = "interactive"
+    # Optional search scope (e.g. the Discord user's role: "engineer", "Data Scientists", ...)
+    role: Optional[str] = None
+    week: Optional[int] = None
+    category: Optional[str] = None
+    source_file: Optional[str] = None
+
+    def to_filters(self) -> RetrievalFilters:
+        return RetrievalFilters(
+            role=normalize_role(self.role),
+            week=self.week,
+            category=self.category,
+            source_file=self.source_file,
+        )
+
+
+async def admit(priority: str):
+    """Waits for a generation slot, or turns an admission rejection into a 503 with Retry-After."""
+    try:
+        return await admission_controller.acquire(priority)
+    except AdmissionRejected as e:
+        retry_after = max(1, math.ceil(e.retry_after))
+        raise HTTPException(
+            status_code=503,
+            detail={"error": e.reason, "retry_after": retry_after},
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+def start_profile(label: str, x_profile: Optional[str], x_admin_token: Optional[str]):
+    """
+    Profiling session for this request: either armed via POST /api/admin/profile, or forced
+    with an `X-Profile: 1` header (which also needs a valid X-Admin-Token).
+    """
+    requested = (x_profile or "").strip().lower() in ("1", "true", "yes", "on")
+    forced = requested and AppSettings.is_admin_token(x_admin_token)
+    return profiler.begin(label, force=forced)
+
+
+async def run_blocking(profile, func, *args):
+    """Runs blocking work (model loading, retrieval, LLM calls) in the threadpool, sampled if profiled."""
+
+    def call():
+        with profiled(profile):
+            return func(*args)
+
+    return await run_in_threadpool(call)
 
 
 # --- 3. STANDARD ENDPOINT (Waits for full answer) ---
+# The endpoints are async so a request waiting for a generation slot holds no threadpool
+# thread; only the blocking work itself goes through run_blocking().
 @router.post("/chat")
-async def chat_endpoint(request: ChatRequest):
-    service = get_service_for_session(request.session_id)
-    response = service.chat(request.query)
+async def chat_endpoint(
+    request: ChatRequest,
+    http_response: Response,
+    x_profile: Optional[str] = Header(default=None),
+    x_admin_token: Optional[str] = Header(default=None),
+):
+    traffic_recorder.record("chat", request)
+    profile = start_profile("chat", x_profile, x_admin_token)
+    try:
+        service = await run_blocking(profile, get_service_for_session, request.session_id)
+        ticket = await admit(request.priority)
+        try:
+            response = await run_blocking(
+                profile, service.chat, request.query, request.to_filters()
+            )
+        finally:
+            ticket.release()
+    finally:
+        profiler.end(profile)
+    if profile is not None:
+        http_response.headers["X-Profile-Id"] = profile.profile_id
 
     # Extract sources
     sources = []
@@ -59,13 +185,38 @@ async def chat_endpoint(request: ChatRequest):
 
 # --- 4. STREAMING ENDPOINT (Real-time) ---
 @router.post("/chat/stream")
-async def stream_chat_endpoint(request: ChatRequest):
-    service = get_service_for_session(request.session_id)
+async def stream_chat_endpoint(
+    request: ChatRequest,
+    x_profile: Optional[str] = Header(default=None),
+    x_admin_token: Optional[str] = Header(default=None),
+):
+    traffic_recorder.record("chat/stream", request)
+    profile = start_profile("chat-stream", x_profile, x_admin_token)
+    try:
+        service = await run_blocking(profile, get_service_for_session, request.session_id)
+        # Admit before streaming starts so a rejection is still a proper 503 response
+        ticket = await admit(request.priority)
+    except BaseException:
+        # Includes CancelledError: the client can disconnect while we wait for a slot
+        profiler.end(profile)
+        raise
+
+    def cleanup():
+        ticket.release()
+        profiler.end(profile)
+
+    # We create a generator function that yields data chunk by chunk.
+    # Each next() of the blocking token generator runs in the threadpool.
+    async def iter_response():
+        try:
+            async for chunk in iterate_in_threadpool(profiled_iter(stream_tokens(), profile)):
+                yield chunk
+        finally:
+            cleanup()
 
-    # We create a generator function that yields data chunk by chunk
-    def iter_response():
+    def stream_tokens():
         # Call the existing stream_chat method from your service
-        streaming_response = service.stream_chat(request.query)
+        streaming_response = service.stream_chat(request.query, request.to_filters())
 
         # 1. Stream the text tokens
         for token in streaming_response.response_gen:
@@ -85,4 +236,18 @@ async def stream_chat_endpoint(request: ChatRequest):
             yield f"\n\n[SOURCES: {sources_json}]"
 
     # Return the StreamingResponse
-    return StreamingResponse(iter_response(), media_type="text/plain")
+    # The background task is a safety net: it frees the slot (and ends the profile) even if the
+    # client disconnects before the generator runs (both calls are idempotent).
+    headers = {"X-Profile-Id": profile.profile_id} if profile is not None else None
+    return StreamingResponse(
+        iter_response(),
+        media_type="text/plain",
+        headers=headers,
+        background=BackgroundTask(cleanup),
+    )
+
+
+# --- 5. ADMISSION STATS (queue times, rejections, slot usage) ---
+@router.get("/admission/stats")
+async def admission_stats_endpoint():
+    return admission_controller.stats()
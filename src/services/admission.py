@@ -0,0 +1,206 @@
+# src/services/admission.py
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from src.config.settings import AppSettings
+from src.utils.metrics import LatencyTracker
+
+# Lower rank = served first. Interactive Discord questions jump ahead of batch/benchmark traffic.
+PRIORITY_RANKS = {"interactive": 0, "batch": 1}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot get a generation slot before its deadline."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason} (retry after ~{retry_after:.1f}s)")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """
+    A held generation slot. release() is idempotent so it can be called from several
+    cleanup paths, and safe to call from a worker thread (it hops back to the event loop).
+    """
+
+    def __init__(self, controller: "AdmissionController", priority: str, queue_time: float):
+        self._controller = controller
+        self.priority = priority
+        self.queue_time = queue_time
+        self.admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self._controller._release_threadsafe(time.monotonic() - self.admitted_at)
+
+
+class AdmissionController:
+    """
+    Bounded concurrency in front of the LLM backend.
+
+    - At most `max_concurrent` requests hold a slot at once.
+    - Waiting requests form a priority queue (interactive before batch, FIFO inside a class).
+      Waiters are futures on the event loop, so a queued request holds no worker thread.
+    - Each priority has a deadline. If the estimated wait is already longer than the deadline,
+      the request is rejected immediately with a retry hint instead of timing out later.
+
+    All state lives on the event loop thread; acquire() must be awaited from the loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        deadlines: Dict[str, float],
+        initial_service_time: float = 5.0,
+    ):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be >= 1")
+        self.max_concurrent = max_concurrent
+        self.deadlines = deadlines
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._active = 0
+        self._waiting = []  # heap of [rank, seq, future]
+        self._seq = itertools.count()
+
+        # Exponentially weighted moving average of how long a slot is held
+        self._service_time = initial_service_time
+        self._ewma_alpha = 0.2
+
+        # --- Metrics ---
+        self.queue_times = {p: LatencyTracker() for p in PRIORITY_RANKS}
+        self.service_times = LatencyTracker()
+        self.admitted = {p: 0 for p in PRIORITY_RANKS}
+        self.rejected = {p: 0 for p in PRIORITY_RANKS}
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionController":
+        return cls(
+            max_concurrent=AppSettings.MAX_CONCURRENT_GENERATIONS,
+            deadlines=dict(AppSettings.ADMISSION_DEADLINES),
+            initial_service_time=AppSettings.ADMISSION_INITIAL_SERVICE_TIME,
+        )
+
+    def _estimate_wait(self, rank: int) -> float:
+        """Expected seconds until a request of this rank gets a slot."""
+        if self._active < self.max_concurrent and not self._waiting:
+            return 0.0
+        ahead = sum(1 for r, _, _ in self._waiting if r <= rank)
+        # Slots free up in "waves" of max_concurrent, each taking ~one service time
+        waves = (ahead // self.max_concurrent) + 1
+        return waves * self._service_time
+
+    def _admit(self, priority: str, start: float) -> AdmissionTicket:
+        self.admitted[priority] += 1
+        queue_time = time.monotonic() - start
+        self.queue_times[priority].observe(queue_time)
+        return AdmissionTicket(self, priority, queue_time)
+
+    async def acquire(
+        self, priority: str = "interactive", deadline: Optional[float] = None
+    ) -> AdmissionTicket:
+        """Waits (without blocking a thread) for a slot. Raises AdmissionRejected if the deadline cannot be met."""
+        if priority not in PRIORITY_RANKS:
+            raise ValueError(
+                f"Unknown priority '{priority}'. Expected one of {list(PRIORITY_RANKS)}"
+            )
+        rank = PRIORITY_RANKS[priority]
+        if deadline is None:
+            deadline = self.deadlines.get(priority, 30.0)
+
+        self._loop = asyncio.get_running_loop()
+        start = time.monotonic()
+
+        # 1. Free slot and nobody queued: go straight in
+        if self._active < self.max_concurrent and not self._waiting:
+            self._active += 1
+            return self._admit(priority, start)
+
+        # 2. Fast rejection: don't queue something that will miss its deadline anyway
+        expected = self._estimate_wait(rank)
+        if expected > deadline:
+            self.rejected[priority] += 1
+            raise AdmissionRejected("Server busy, expected wait exceeds deadline", expected)
+
+        # 3. Join the queue. _wake_waiters() hands us a slot by resolving our future.
+        future = self._loop.create_future()
+        entry = [rank, next(self._seq), future]
+        heapq.heappush(self._waiting, entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=deadline)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed to us at the same moment we gave up: pass it on
+                self._active -= 1
+            else:
+                future.cancel()
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+            self._wake_waiters()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rejected[priority] += 1
+            raise AdmissionRejected("Deadline exceeded while queued", self._estimate_wait(rank))
+
+        return self._admit(priority, start)
+
+    def _wake_waiters(self):
+        """Hands free slots to the highest-priority waiters (slot counted before they resume)."""
+        while self._active < self.max_concurrent and self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if future.done():
+                continue
+            self._active += 1
+            future.set_result(None)
+
+    def _release(self, held_for: float):
+        self._active -= 1
+        self._service_time = (
+            self._ewma_alpha * held_for + (1 - self._ewma_alpha) * self._service_time
+        )
+        self.service_times.observe(held_for)
+        self._wake_waiters()
+
+    def _release_threadsafe(self, held_for: float):
+        loop = self._loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is None or running is loop or loop.is_closed():
+            self._release(held_for)
+        else:
+            loop.call_soon_threadsafe(self._release, held_for)
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "interactive", deadline: Optional[float] = None):
+        ticket = await self.acquire(priority, deadline)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "active": self._active,
+            "queued": len(self._waiting),
+            "estimated_service_time": self._service_time,
+            "deadlines": self.deadlines,
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+            "queue_time": {p: t.snapshot() for p, t in self.queue_times.items()},
+            "service_time": self.service_times.snapshot(),
+        }
+
+
+# Single controller shared by every session in this process (all of them hit the same vLLM GPU)
+admission_controller = AdmissionController.from_settings()
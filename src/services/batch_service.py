@@ -0,0 +1,226 @@
+# src/services/batch_service.py
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.schema import NodeWithScore
+
+from src.config.prompts import BATCH_CONTEXT_PROMPT, SYSTEM_PROMPT
+from src.config.settings import AppSettings
+from src.retrieval.filters import RetrievalFilters
+from src.retrieval.retriever import HybridRAGRetriever
+from src.utils.metrics import summarize
+
+
+def load_questions(input_path: str) -> List[dict]:
+    """Reads questions from JSONL ({"id": ..., "question": ...} per line). Missing ids = line number."""
+    questions = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            question = record.get("question") or record.get("query")
+            if not question:
+                print(f"   ⚠️  Line {line_no}: no 'question' field, skipping.")
+                continue
+            questions.append({**record, "id": str(record.get("id", line_no)), "question": question})
+    return questions
+
+
+def errors_path_for(output_path: str) -> str:
+    """Failed questions go next to the answers: answers.jsonl -> answers.errors.jsonl"""
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.errors{ext or '.jsonl'}"
+
+
+def load_completed_ids(output_path: str) -> Set[str]:
+    """
+    Ids already answered in a previous (possibly interrupted) run.
+    The output is rewritten without records a resumed run would duplicate or corrupt:
+    error records (from older runs) and a truncated last line from a run killed mid-write.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    kept, dropped = [], 0
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                dropped += 1
+                continue
+            if "error" in record or str(record["id"]) in done:
+                dropped += 1
+                continue
+            done.add(str(record["id"]))
+            kept.append(line if line.endswith("\n") else line + "\n")
+
+    if dropped:
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(tmp_path, output_path)
+        print(f"   🧹 Removed {dropped} failed/incomplete records from {output_path} (they will be retried).")
+    return done
+
+
+def _chunks(items: List[dict], size: int) -> Iterable[List[dict]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+class BatchQAService:
+    """
+    Offline question answering for many questions at once.
+
+    Retrieval runs in batches (one embedding call + one BM25 call per batch, on the same
+    index and fusion as /api/chat) in a worker thread, while generation requests for
+    earlier questions are already in flight against the OpenAI-compatible server.
+    Answers are appended to the output JSONL as they finish, so an interrupted run
+    resumes where it stopped; failures go to a separate errors file and are retried.
+
+    Generation goes straight to the LLM server and bypasses the API's admission control,
+    so `max_in_flight` adds to the interactive load: keep it low while the bot is live.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = AppSettings.BATCH_MAX_IN_FLIGHT,
+        batch_size: int = AppSettings.BATCH_RETRIEVAL_SIZE,
+        filters: Optional[RetrievalFilters] = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.filters = filters
+        self.retriever = HybridRAGRetriever(top_k=3, verbose=False)
+        self.llm = AppSettings.get_llm()
+
+    def _build_messages(self, question: str, nodes: List[NodeWithScore]) -> List[ChatMessage]:
+        context_str = "\n\n".join(n.node.get_content() for n in nodes)
+        return [
+            ChatMessage(role=MessageRole.SYSTEM, content=SYSTEM_PROMPT),
+            ChatMessage(
+                role=MessageRole.USER,
+                content=BATCH_CONTEXT_PROMPT.format(context_str=context_str, question=question),
+            ),
+        ]
+
+    async def _answer(
+        self,
+        item: dict,
+        nodes: List[NodeWithScore],
+        semaphore: asyncio.Semaphore,
+        out_file,
+        errors_file,
+        latencies: List[float],
+        errors: List[str],
+    ):
+        start = time.perf_counter()
+        try:
+            response = await self.llm.achat(self._build_messages(item["question"], nodes))
+            record = {
+                **item,
+                "answer": response.message.content,
+                "sources": [
+                    {
+                        "file_name": n.metadata.get("file_name", "Unknown"),
+                        "score": n.score if n.score else 0.0,
+                    }
+                    for n in nodes
+                ],
+                "latency": time.perf_counter() - start,
+            }
+            latencies.append(record["latency"])
+            target = out_file
+        except Exception as e:
+            record = {**item, "error": str(e)}
+            errors.append(item["id"])
+            target = errors_file
+        finally:
+            semaphore.release()
+
+        # Single event loop thread -> writes never interleave. Flush so a crash loses nothing.
+        target.write(json.dumps(record, ensure_ascii=False) + "\n")
+        target.flush()
+
+    async def _run(self, todo: List[dict], output_path: str) -> Dict[str, object]:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        tasks = []
+        latencies: List[float] = []
+        errors: List[str] = []
+        retrieval_time = 0.0
+
+        # Errors are only about this run: every failed question is retried by the next one
+        with open(output_path, "a", encoding="utf-8") as out_file, open(
+            errors_path_for(output_path), "w", encoding="utf-8"
+        ) as errors_file:
+            for batch in _chunks(todo, self.batch_size):
+                # 1. Retrieve the whole batch off the event loop, so in-flight generations keep streaming
+                t0 = time.perf_counter()
+                results = await loop.run_in_executor(
+                    None,
+                    self.retriever.retrieve_batch,
+                    [q["question"] for q in batch],
+                    self.filters,
+                )
+                retrieval_time += time.perf_counter() - t0
+
+                # 2. Hand each question to generation; the semaphore caps requests in flight
+                for item, nodes in zip(batch, results):
+                    await semaphore.acquire()
+                    tasks.append(
+                        asyncio.create_task(
+                            self._answer(
+                                item, nodes, semaphore, out_file, errors_file, latencies, errors
+                            )
+                        )
+                    )
+                print(f"   📦 Retrieved {len(tasks)}/{len(todo)} questions...")
+
+            await asyncio.gather(*tasks)
+
+        return {"latencies": latencies, "errors": errors, "retrieval_time": retrieval_time}
+
+    def run(self, input_path: str, output_path: str) -> Dict[str, object]:
+        questions = load_questions(input_path)
+        done = load_completed_ids(output_path)
+        todo = [q for q in questions if q["id"] not in done]
+        print(
+            f"📋 {len(questions)} questions loaded, {len(questions) - len(todo)} already answered, "
+            f"{len(todo)} to go (in flight: {self.max_in_flight}, retrieval batch: {self.batch_size})."
+        )
+        if not todo:
+            return {"answered": 0, "failed": 0}
+
+        start = time.perf_counter()
+        result = asyncio.run(self._run(todo, output_path))
+        elapsed = time.perf_counter() - start
+
+        answered = len(result["latencies"])
+        report = {
+            "answered": answered,
+            "failed": len(result["errors"]),
+            "elapsed_seconds": elapsed,
+            "throughput_qps": answered / elapsed if elapsed else 0.0,
+            "retrieval_seconds": result["retrieval_time"],
+            "generation_latency": summarize(result["latencies"]),
+        }
+
+        print("\n📊 --- BATCH REPORT ---")
+        print(f"Answered:   {answered} ({report['failed']} failed, re-run to retry them)")
+        if report["failed"]:
+            print(f"⚠️  Failures written to: {errors_path_for(output_path)}")
+        print(f"Elapsed:    {elapsed:.1f}s (retrieval: {result['retrieval_time']:.1f}s)")
+        print(f"Throughput: {report['throughput_qps']:.2f} questions/s")
+        lat = report["generation_latency"]
+        print(f"Generation: p50 {lat['p50']:.2f}s | p95 {lat['p95']:.2f}s | max {lat['max']:.2f}s")
+        print(f"💾 Results written to: {output_path}")
+        return report
@@ -0,0 +1,237 @@
+# src/services/memory.py
+import threading
+import zlib
+from typing import Any, Callable, List, Optional
+
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.memory.types import BaseMemory
+from llama_index.core.utils import get_tokenizer
+
+from src.config.prompts import SUMMARIZE_HISTORY_PROMPT
+from src.config.settings import AppSettings
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+# Shared by every session: summaries wait for each other, not for (or in front of) chat turns
+_summary_slots = threading.BoundedSemaphore(AppSettings.MAX_CONCURRENT_SUMMARIES)
+
+
+class CompactChatMemory(BaseMemory):
+    """
+    Drop-in replacement for ChatMemoryBuffer with cheaper bookkeeping:
+
+    - Each message is tokenized ONCE when it is added; the token limit is then enforced
+      from cached counts (ChatMemoryBuffer re-tokenizes the history on every get()).
+    - compact() zlib-compresses message text while a session is idle; it is expanded
+      again as soon as the session receives a new message.
+    - Once raw history passes `summarize_threshold` tokens, the oldest turns are
+      summarized by the LLM in a background thread, so condense prompts stay short.
+      Summaries take no admission slot; at most MAX_CONCURRENT_SUMMARIES run at once.
+    """
+
+    token_limit: int = AppSettings.MEMORY_TOKEN_LIMIT
+    summarize_threshold: int = AppSettings.MEMORY_SUMMARIZE_THRESHOLD
+    keep_recent_tokens: int = AppSettings.MEMORY_KEEP_RECENT_TOKENS
+    tokenizer_fn: Callable[[str], List] = Field(default_factory=get_tokenizer, exclude=True)
+    llm: Optional[Any] = Field(default=None, exclude=True)
+
+    _roles: List[MessageRole] = PrivateAttr(default_factory=list)
+    _contents: List[Any] = PrivateAttr(default_factory=list)  # str, or zlib bytes when compact
+    _tokens: List[int] = PrivateAttr(default_factory=list)
+    _total_tokens: int = PrivateAttr(default=0)
+    _summary: str = PrivateAttr(default="")
+    _summary_tokens: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.RLock)
+    _summary_thread: Optional[threading.Thread] = PrivateAttr(default=None)
+    _epoch: int = PrivateAttr(default=0)  # bumped by reset() so stale summaries are dropped
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CompactChatMemory"
+
+    @classmethod
+    def from_defaults(cls, llm: Optional[Any] = None, **kwargs) -> "CompactChatMemory":
+        return cls(llm=llm, **kwargs)
+
+    # --- Storage helpers ---
+    def _count(self, text: str) -> int:
+        return len(self.tokenizer_fn(text))
+
+    def _text(self, i: int) -> str:
+        content = self._contents[i]
+        return zlib.decompress(content).decode("utf-8") if isinstance(content, bytes) else content
+
+    def _message(self, i: int) -> ChatMessage:
+        return ChatMessage(role=self._roles[i], content=self._text(i))
+
+    def _summary_message(self) -> ChatMessage:
+        return ChatMessage(role=MessageRole.SYSTEM, content=SUMMARY_PREFIX + self._summary)
+
+    def compact(self):
+        """Compresses stored text (call for idle sessions). Counts and summary stay as they are."""
+        with self._lock:
+            for i, content in enumerate(self._contents):
+                if isinstance(content, str):
+                    self._contents[i] = zlib.compress(content.encode("utf-8"))
+
+    def _expand(self):
+        for i, content in enumerate(self._contents):
+            if isinstance(content, bytes):
+                self._contents[i] = zlib.decompress(content).decode("utf-8")
+
+    # --- BaseMemory interface ---
+    def get(
+        self, input: Optional[str] = None, initial_token_count: int = 0, **kwargs
+    ) -> List[ChatMessage]:
+        """Summary (if any) + the most recent messages that fit in the token limit."""
+        with self._lock:
+            budget = self.token_limit - initial_token_count
+            if budget < 0:
+                raise ValueError("Initial token count exceeds token limit")
+
+            include_summary = bool(self._summary) and self._summary_tokens <= budget
+            if include_summary:
+                budget -= self._summary_tokens
+
+            # Walk back from the newest message using the cached counts
+            start, used = len(self._tokens), 0
+            while start > 0 and used + self._tokens[start - 1] <= budget:
+                start -= 1
+                used += self._tokens[start]
+
+            # Like ChatMemoryBuffer: history must not start with an assistant/tool message
+            while start < len(self._roles) and self._roles[start] != MessageRole.USER:
+                start += 1
+
+            messages = [self._message(i) for i in range(start, len(self._roles))]
+            if include_summary:
+                messages.insert(0, self._summary_message())
+            return messages
+
+    def get_all(self) -> List[ChatMessage]:
+        with self._lock:
+            messages = [self._message(i) for i in range(len(self._roles))]
+            if self._summary:
+                messages.insert(0, self._summary_message())
+            return messages
+
+    def message_count(self) -> int:
+        """Stored messages, counted without decompressing them (summary included)."""
+        with self._lock:
+            return len(self._roles) + (1 if self._summary else 0)
+
+    def put(self, message: ChatMessage) -> None:
+        with self._lock:
+            # A new message means the session is active again
+            self._expand()
+            text = str(message.content or "")
+            tokens = self._count(text)
+            self._roles.append(message.role)
+            self._contents.append(text)
+            self._tokens.append(tokens)
+            self._total_tokens += tokens
+            self._maybe_summarize()
+
+    def set(self, messages: List[ChatMessage]) -> None:
+        self.reset()
+        for message in messages:
+            self.put(message)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._roles.clear()
+            self._contents.clear()
+            self._tokens.clear()
+            self._total_tokens = 0
+            self._summary = ""
+            self._summary_tokens = 0
+            self._epoch += 1
+
+    # --- Background summarization ---
+    def _maybe_summarize(self):
+        """Starts a summary of the oldest turns when raw history gets too long (caller holds the lock)."""
+        if self.llm is None or self._total_tokens <= self.summarize_threshold:
+            return
+        if self._summary_thread is not None and self._summary_thread.is_alive():
+            return
+
+        # Keep ~keep_recent_tokens verbatim; the cut lands on a user message so turns stay whole
+        cut, kept = len(self._tokens), 0
+        while cut > 0 and kept + self._tokens[cut - 1] <= self.keep_recent_tokens:
+            cut -= 1
+            kept += self._tokens[cut]
+        while cut < len(self._roles) and self._roles[cut] != MessageRole.USER:
+            cut += 1
+        if cut == 0 or cut >= len(self._roles):
+            return
+
+        transcript = "\n".join(f"{self._roles[i].value}: {self._text(i)}" for i in range(cut))
+        self._summary_thread = threading.Thread(
+            target=self._summarize,
+            args=(self._epoch, cut, transcript, self._summary),
+            daemon=True,
+        )
+        self._summary_thread.start()
+
+    def _summarize(self, epoch: int, count: int, transcript: str, previous_summary: str):
+        prompt = SUMMARIZE_HISTORY_PROMPT.format(
+            previous_summary=previous_summary or "(none)", transcript=transcript
+        )
+        try:
+            # Own limit instead of an admission slot: a summary never holds up a chat turn
+            with _summary_slots:
+                summary = str(self.llm.complete(prompt)).strip()
+        except Exception as e:
+            print(f"⚠️  Memory summarization skipped: {e}")
+            return
+
+        with self._lock:
+            if epoch != self._epoch:
+                return  # history was reset while we were summarizing
+            self._total_tokens -= sum(self._tokens[:count])
+            del self._roles[:count]
+            del self._contents[:count]
+            del self._tokens[:count]
+            self._summary = summary
+            self._summary_tokens = self._count(self._summary_message().content)
+
+    def wait_for_summary(self, timeout: Optional[float] = None):
+        """Blocks until a running background summary finishes (used by tests/benchmarks)."""
+        thread = self._summary_thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+# Simple benchmark: 50-turn conversation, ChatMemoryBuffer vs CompactChatMemory
+if __name__ == "__main__":
+    import time
+
+    from llama_index.core.llms import MockLLM
+    from llama_index.core.memory import ChatMemoryBuffer
+
+    TURNS = 50
+    question = "I am a data scientist in week {n}, which videos and links should I use for the assignment? " * 3
+    answer = "Here are the resources for that week: https://example.com/video, the playlist and the agenda. " * 8
+
+    def run(memory, label: str):
+        per_turn, prompt_tokens = [], []
+        tokenizer = get_tokenizer()
+        for n in range(TURNS):
+            start = time.perf_counter()
+            history = memory.get(input=question)  # condense step
+            memory.put(ChatMessage(role=MessageRole.USER, content=question.format(n=n)))
+            context = memory.get(initial_token_count=400)  # answer step
+            memory.put(ChatMessage(role=MessageRole.ASSISTANT, content=answer))
+            per_turn.append(time.perf_counter() - start)
+            prompt_tokens.append(len(tokenizer(" ".join(str(m.content) for m in history))))
+            if isinstance(memory, CompactChatMemory):
+                memory.wait_for_summary()  # stands in for the user's think-time between turns
+
+        print(f"\n📊 {label}")
+        print(f"   Avg memory overhead / turn: {1000 * sum(per_turn) / TURNS:.2f} ms")
+        print(f"   Last 10 turns overhead:     {1000 * sum(per_turn[-10:]) / 10:.2f} ms")
+        print(f"   Condense history tokens:    avg {sum(prompt_tokens) / TURNS:.0f}, max {max(prompt_tokens)}")
+
+    run(ChatMemoryBuffer.from_defaults(token_limit=3000), "ChatMemoryBuffer")
+    run(CompactChatMemory.from_defaults(llm=MockLLM(max_tokens=120)), "CompactChatMemory")
@@ -1,21 +1,34 @@
 # src/services/rag_service.py
+from typing import Optional
+
 from llama_index.core.chat_engine import CondensePlusContextChatEngine
-from llama_index.core.memory import ChatMemoryBuffer
 
+from src.config.prompts import SYSTEM_PROMPT
 from src.config.settings import AppSettings
+from src.retrieval.filters import RetrievalFilters, filters_scope
 from src.retrieval.retriever import HybridRAGRetriever
+from src.services.memory import CompactChatMemory
 
 
 class RAGService:
-    def __init__(self):
-        # 1. Initialize your Hybrid Retriever
-        self.retriever = HybridRAGRetriever(top_k=3)
+    def __init__(
+        self,
+        filters: Optional[RetrievalFilters] = None,
+        retriever: Optional[HybridRAGRetriever] = None,
+        llm=None,
+    ):
+        # 1. Initialize your Hybrid Retriever (optionally scoped by role / week / ...)
+        #    The API passes one shared retriever: loading the embedding model and the
+        #    nodes per session would cost seconds and hundreds of MB each time.
+        self.retriever = retriever or HybridRAGRetriever(top_k=3, filters=filters)
 
         # 2. Get the LLM (Llama-3.1 from Docker)
-        self.llm = AppSettings.get_llm()
+        self.llm = llm or AppSettings.get_llm()
 
-        # 3. Initialize Memory (Holds last ~5 turns)
-        self.memory = ChatMemoryBuffer.from_defaults(token_limit=3000)
+        # 3. Initialize Memory (recent turns verbatim + background summary of older ones)
+        self.memory = CompactChatMemory.from_defaults(
+            llm=self.llm, token_limit=AppSettings.MEMORY_TOKEN_LIMIT
+        )
 
         # 4. Create the Chat Engine
         # This engine will:
@@ -27,15 +40,7 @@ class RAGService:
             retriever=self.retriever,
             llm=self.llm,
             memory=self.memory,
-            system_prompt=(
-                "You are a helpful AI Assistant for the PMA Bootcamp. "
-                "Use the provided context to answer questions. "
-                "CRITICAL: DO NOT SUMMARIZE LISTS OF LINKS. "
-                "If the context provides a list of resources, videos, or tools, "
-                "you must output EVERY SINGLE URL found in the context. "
-                "Do not group them. List them individually with their full clickable markdown syntax. "
-                "If you don't know the answer, say so."
-            ),
+            system_prompt=SYSTEM_PROMPT,
             verbose=True,
         )
 
@@ -48,19 +53,23 @@ class RAGService:
 
     # In src/services/rag_service.py
 
-    def chat(self, user_query: str):
+    def chat(self, user_query: str, filters: Optional[RetrievalFilters] = None):
         """
         Processes a user query with history and returns the FULL Response object.
         Do NOT wrap this in str(), or you lose the source nodes!
+        `filters` scope this question's search only (e.g. to the Discord user's role).
         """
-        return self.chat_engine.chat(user_query)
+        with filters_scope(filters):
+            return self.chat_engine.chat(user_query)
 
-    def stream_chat(self, user_query: str):
+    def stream_chat(self, user_query: str, filters: Optional[RetrievalFilters] = None):
         """
         Returns a StreamingAgentChatResponse object.
         You iterate over this object to get tokens one by one.
+        (Retrieval happens before this returns, so the filter scope can end here.)
         """
-        return self.chat_engine.stream_chat(user_query)
+        with filters_scope(filters):
+            return self.chat_engine.stream_chat(user_query)
 
     def reset_history(self):
         self.memory.reset()
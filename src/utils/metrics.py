@@ -0,0 +1,52 @@
+import math
+import threading
+from collections import deque
+from typing import Dict, Iterable, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 if empty)."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(values: Iterable[float]) -> Dict[str, float]:
+    """Count / mean / p50 / p95 / p99 / max for a batch of latencies (seconds)."""
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1],
+    }
+
+
+class LatencyTracker:
+    """
+    Thread-safe rolling window of latency samples.
+    Only the last `window` samples are kept so memory stays flat in long-running servers.
+    """
+
+    def __init__(self, window: int = 1024):
+        self._samples = deque(maxlen=window)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self._total += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            samples = list(self._samples)
+            total = self._total
+        stats = summarize(samples)
+        stats["total"] = total
+        return stats
@@ -0,0 +1,313 @@
+# src/utils/profiling.py
+"""
+Opt-in diagnostics for latency spikes and leaks.
+
+- SamplingProfiler: a stdlib-only sampling profiler. While a request is being profiled,
+  a background thread samples that request's thread stack every few milliseconds and
+  counts "folded" stacks (root;...;leaf N), the input format of flamegraph.pl,
+  speedscope and inferno. When nothing is being profiled, no sampler thread runs.
+- MemoryTracker: tracemalloc start / snapshot / diff / stop.
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from src.config.settings import AppSettings
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold_stack(frame) -> str:
+    """'root;caller;...;leaf' for a frame (flamegraph folded-stack format)."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class ProfileSession:
+    """Samples collected for one request. Attach the thread(s) that do the request's work."""
+
+    def __init__(self, profile_id: str, label: str):
+        self.profile_id = profile_id
+        self.label = label
+        self.started_at = time.time()
+        self.threads = set()
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampler_seconds = 0.0  # time the sampler spent on this session (its overhead)
+        self.duration = 0.0
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "profile_id": self.profile_id,
+            "label": self.label,
+            "samples": self.samples,
+            "duration_seconds": self.duration,
+            "sampler_overhead_seconds": self.sampler_seconds,
+        }
+
+
+class SamplingProfiler:
+    """
+    Arms profiling for the next N requests (admin endpoint) or for single requests
+    carrying the profiling header. Finished profiles are kept in memory (last
+    PROFILE_KEEP_LAST) and written to PROFILE_OUTPUT_DIR as .folded files.
+    """
+
+    def __init__(
+        self,
+        interval: float = AppSettings.PROFILE_SAMPLE_INTERVAL,
+        output_dir: str = AppSettings.PROFILE_OUTPUT_DIR,
+        keep_last: int = AppSettings.PROFILE_KEEP_LAST,
+    ):
+        self.interval = interval
+        self.output_dir = output_dir
+        self.keep_last = keep_last
+
+        self._lock = threading.Lock()
+        self._armed = 0
+        self._active: Dict[str, ProfileSession] = {}
+        self._finished: "OrderedDict[str, ProfileSession]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._sampler: Optional[threading.Thread] = None
+
+    # --- Arming ---
+    def arm(self, requests: int) -> int:
+        """Profiles the next `requests` requests. Returns how many are armed now."""
+        with self._lock:
+            self._armed = max(0, requests)
+            return self._armed
+
+    def armed(self) -> int:
+        return self._armed
+
+    def begin(self, label: str, force: bool = False) -> Optional[ProfileSession]:
+        """Starts a session if this request should be profiled, else None."""
+        if not force and self._armed <= 0:
+            return None  # Off path: a single attribute read, no lock
+        with self._lock:
+            if not force:
+                if self._armed <= 0:
+                    return None
+                self._armed -= 1
+            profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self._ids)}-{label}"
+            session = ProfileSession(profile_id, label)
+            self._active[profile_id] = session
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+                self._sampler.start()
+        return session
+
+    def end(self, session: Optional[ProfileSession]):
+        if session is None:
+            return
+        with self._lock:
+            # Idempotent: streaming responses may end a session from two cleanup paths
+            if self._active.pop(session.profile_id, None) is None:
+                return
+            session.duration = time.time() - session.started_at
+            self._finished[session.profile_id] = session
+            while len(self._finished) > self.keep_last:
+                self._finished.popitem(last=False)
+        self._write(session)
+        print(
+            f"🔥 Profile {session.profile_id}: {session.samples} samples "
+            f"in {session.duration:.2f}s (sampler overhead {session.sampler_seconds * 1000:.1f} ms)"
+        )
+
+    # --- Sampling ---
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                sessions = list(self._active.values())
+                if not sessions:
+                    # Nothing to profile: the thread exits and costs nothing until the next begin()
+                    self._sampler = None
+                    return
+            start = time.perf_counter()
+            frames = sys._current_frames()
+            for session in sessions:
+                for thread_id in list(session.threads):
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        session.stacks[fold_stack(frame)] += 1
+                        session.samples += 1
+            cost = time.perf_counter() - start
+            for session in sessions:
+                session.sampler_seconds += cost / len(sessions)
+            del frames
+            time.sleep(self.interval)
+
+    # --- Results ---
+    def _write(self, session: ProfileSession):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{session.profile_id}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(session.folded() + "\n")
+
+    def list_profiles(self) -> List[dict]:
+        with self._lock:
+            return [s.summary() for s in reversed(self._finished.values())]
+
+    def get_profile(self, profile_id: str) -> Optional[ProfileSession]:
+        with self._lock:
+            return self._finished.get(profile_id)
+
+
+@contextmanager
+def profiled(session: Optional[ProfileSession]):
+    """Samples the current thread for the duration of the block (no-op when session is None)."""
+    if session is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    session.threads.add(thread_id)
+    try:
+        yield
+    finally:
+        session.threads.discard(thread_id)
+
+
+def profiled_iter(iterable: Iterable, session: Optional[ProfileSession]):
+    """
+    Wraps a (streaming) generator so every next() is sampled in whichever worker
+    thread runs it: Starlette may resume a sync generator on a different thread each time.
+    """
+    if session is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        with profiled(session):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class MemoryTracker:
+    """tracemalloc wrapper: take snapshots and diff each one against the previous."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def start(self, frames: int = AppSettings.TRACEMALLOC_FRAMES) -> dict:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._previous = None
+        return self.status()
+
+    def stop(self) -> dict:
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+        return self.status()
+
+    def status(self) -> dict:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory() if tracing else 0,
+        }
+
+    def snapshot(self, limit: int = 25, group_by: str = "lineno") -> dict:
+        """Top allocations, plus growth since the previous snapshot (the leak signal)."""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc is not running; start it first")
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                )
+            )
+            previous, self._previous = self._previous, snapshot
+
+        top = [
+            {"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(group_by)[:limit]
+        ]
+        diff = None
+        if previous is not None:
+            diff = [
+                {
+                    "location": str(stat.traceback),
+                    "size_diff_bytes": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                    "size_bytes": stat.size,
+                }
+                for stat in snapshot.compare_to(previous, group_by)[:limit]
+            ]
+        return {**self.status(), "top": top, "diff_since_previous": diff}
+
+
+profiler = SamplingProfiler()
+memory_tracker = MemoryTracker()
+
+
+# Simple overhead benchmark: the same CPU-bound work with profiling off / sampling / tracemalloc
+if __name__ == "__main__":
+
+    docs = [{f"w{(i * j) % 97}": j % 5 + 1 for j in range(40)} for i in range(300)]
+
+    def workload():
+        # BM25-like scoring loop: pure-Python dict lookups and float math
+        total = 0.0
+        for _ in range(300):
+            for doc in docs:
+                for term in ("w1", "w7", "w42"):
+                    tf = doc.get(term, 0)
+                    total += tf * 2.2 / (tf + 1.2)
+        return total
+
+    def timed(runs: int = 5) -> float:
+        best = float("inf")
+        for _ in range(runs):
+            start = time.perf_counter()
+            workload()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    baseline = timed()
+
+    # "Off" path: what every unprofiled request pays (begin() returning None)
+    start = time.perf_counter()
+    for _ in range(100_000):
+        profiler.end(profiler.begin("off"))
+    off_cost = (time.perf_counter() - start) / 100_000
+
+    profiler.output_dir = os.path.join(AppSettings.PROFILE_OUTPUT_DIR, "benchmark")
+    session = profiler.begin("benchmark", force=True)
+    with profiled(session):
+        sampled = timed()
+    profiler.end(session)
+
+    memory_tracker.start()
+    traced = timed()
+    memory_tracker.stop()
+
+    print("\n📊 --- PROFILING OVERHEAD ---")
+    print(f"Baseline:           {baseline * 1000:.1f} ms")
+    print(f"Off (per request):  {off_cost * 1e6:.2f} µs")
+    print(f"Sampling profiler:  {sampled * 1000:.1f} ms ({sampled / baseline - 1:+.1%})")
+    print(f"tracemalloc:        {traced * 1000:.1f} ms ({traced / baseline - 1:+.1%})")
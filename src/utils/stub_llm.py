@@ -0,0 +1,97 @@
+# src/utils/stub_llm.py
+"""
+OpenAI-compatible stand-in for the vLLM server.
+
+It does no real inference: it waits `ttft` seconds, then emits canned tokens at
+`token_rate` tokens/second. Point LLM_API_BASE at it to load-test the API on a
+laptop without a GPU:
+
+    python src/main.py stub-llm
+    LLM_API_BASE=http://localhost:8001/v1 python src/main.py serve
+"""
+import asyncio
+import json
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from src.config.settings import AppSettings
+
+_WORDS = (
+    "The bootcamp materials for this week are listed in the agenda . "
+    "Check the resources channel and the training playlist for details . "
+).split()
+
+
+def _fake_tokens(n: int):
+    for i in range(n):
+        yield _WORDS[i % len(_WORDS)] + " "
+
+
+def create_stub_llm_app(
+    token_rate: float = AppSettings.STUB_LLM_TOKEN_RATE,
+    ttft: float = AppSettings.STUB_LLM_TTFT,
+    output_tokens: int = 64,
+) -> FastAPI:
+    """Builds the stub app. `token_rate` is tokens/second per request, `ttft` is seconds to first token."""
+    app = FastAPI(title="Stub LLM", description="OpenAI-compatible fake backend")
+    app.state.requests_served = 0
+
+    def _n_tokens(body: dict) -> int:
+        max_tokens = body.get("max_tokens") or output_tokens
+        return max(1, min(int(max_tokens), output_tokens))
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": AppSettings.LLM_MODEL, "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        n = _n_tokens(body)
+        model = body.get("model", AppSettings.LLM_MODEL)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        app.state.requests_served += 1
+
+        if not body.get("stream"):
+            await asyncio.sleep(ttft + n / token_rate)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "".join(_fake_tokens(n)).strip()},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 0, "completion_tokens": n, "total_tokens": n},
+            }
+
+        async def event_stream():
+            def chunk(delta: dict, finish_reason=None) -> str:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+                return f"data: {json.dumps(payload)}\n\n"
+
+            await asyncio.sleep(ttft)
+            yield chunk({"role": "assistant", "content": ""})
+            for token in _fake_tokens(n):
+                yield chunk({"content": token})
+                await asyncio.sleep(1.0 / token_rate)
+            yield chunk({}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    return app
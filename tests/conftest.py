@@ -0,0 +1,65 @@
+import socket
+from collections import OrderedDict
+
+import pytest
+from fastapi import FastAPI
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from src.config.settings import AppSettings
+from src.loadtest.replay import serve_in_thread
+from src.retrieval.filters import current_filters
+from src.routes import rag
+from src.utils.stub_llm import create_stub_llm_app
+
+
+class FixedRetriever(BaseRetriever):
+    """Stands in for HybridRAGRetriever (no Chroma, no embedding model)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.nodes = [
+            TextNode(
+                text="Week 3 agenda: the training playlist and the resources channel.",
+                metadata={"file_name": "week_3_agenda.md"},
+            )
+        ]
+        self.seen_filters = []
+
+    def _retrieve(self, query_bundle):
+        self.seen_filters.append(current_filters())
+        return [NodeWithScore(node=node, score=1.0) for node in self.nodes]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def stub_llm_url():
+    app = create_stub_llm_app(token_rate=2000, ttft=0.0, output_tokens=8)
+    with serve_in_thread(app, free_port()) as base_url:
+        yield f"{base_url}/v1"
+
+
+@pytest.fixture
+def rag_app(stub_llm_url, monkeypatch):
+    """The chat API against the stub LLM, with fresh sessions and a FixedRetriever."""
+    monkeypatch.setattr(AppSettings, "LLM_API_BASE", stub_llm_url)
+    monkeypatch.setattr(rag, "HybridRAGRetriever", FixedRetriever)
+    monkeypatch.setattr(rag, "sessions", OrderedDict())
+    monkeypatch.setattr(rag, "last_seen", {})
+    monkeypatch.setattr(rag, "_shared", {})
+
+    app = FastAPI()
+    app.include_router(rag.router, prefix="/api")
+    return app
+
+
+@pytest.fixture
+def rag_server(rag_app):
+    """rag_app on a real port, for clients that need a URL (the replay)."""
+    with serve_in_thread(rag_app, free_port()) as base_url:
+        yield base_url
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services.admission import AdmissionController, AdmissionRejected
+
+
+def make_controller(max_concurrent=1, interactive=5.0, batch=5.0, service_time=0.1):
+    return AdmissionController(
+        max_concurrent=max_concurrent,
+        deadlines={"interactive": interactive, "batch": batch},
+        initial_service_time=service_time,
+    )
+
+
+def test_interactive_is_served_before_batch():
+    async def scenario():
+        controller = make_controller()
+        holder = await controller.acquire("interactive")
+        order = []
+
+        async def wait_for_slot(priority):
+            ticket = await controller.acquire(priority)
+            order.append(priority)
+            ticket.release()
+
+        # Batch arrives first, interactive second: interactive still goes first
+        batch = asyncio.create_task(wait_for_slot("batch"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(wait_for_slot("interactive"))
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 2
+
+        holder.release()
+        await asyncio.gather(batch, interactive)
+        return order, controller.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["interactive", "batch"]
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_rejects_fast_with_retry_hint_when_deadline_cannot_be_met():
+    async def scenario():
+        # Each slot is held ~10s, but interactive requests may only wait 1s
+        controller = make_controller(interactive=1.0, service_time=10.0)
+        holder = await controller.acquire("interactive")
+
+        start = time.monotonic()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("interactive")
+        elapsed = time.monotonic() - start
+
+        holder.release()
+        return rejected.value, elapsed, controller.stats()
+
+    error, elapsed, stats = asyncio.run(scenario())
+    assert elapsed < 0.1  # rejected up front, not after waiting out the deadline
+    assert error.retry_after >= 10.0
+    assert stats["rejected"]["interactive"] == 1
+
+
+def test_deadline_expiry_while_queued_frees_the_queue():
+    async def scenario():
+        # The estimate (0.01s) says the wait is fine, but the holder never lets go in time
+        controller = make_controller(interactive=0.05, service_time=0.01)
+        holder = await controller.acquire("interactive")
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("interactive")
+        stats = controller.stats()
+
+        holder.release()
+        # The slot is usable again right away
+        (await controller.acquire("interactive")).release()
+        return rejected.value, stats, controller.stats()
+
+    error, while_held, after = asyncio.run(scenario())
+    assert "Deadline exceeded" in error.reason
+    assert while_held["queued"] == 0
+    assert while_held["rejected"]["interactive"] == 1
+    assert after["active"] == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        controller = make_controller()
+        holder = await controller.acquire("interactive")
+        waiter = asyncio.create_task(controller.acquire("interactive"))
+        await asyncio.sleep(0)
+
+        # Client disconnected: the request task is cancelled while queued
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        holder.release()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_release_from_worker_thread_wakes_waiter():
+    async def scenario():
+        controller = make_controller()
+        holder = await controller.acquire("interactive")
+        waiter = asyncio.create_task(controller.acquire("interactive"))
+        await asyncio.sleep(0)
+
+        # Sync endpoints / streaming generators release from the threadpool
+        await asyncio.to_thread(holder.release)
+        ticket = await asyncio.wait_for(waiter, timeout=1)
+        ticket.release()
+        ticket.release()  # idempotent
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0
+    assert stats["admitted"]["interactive"] == 2
@@ -0,0 +1,97 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.config.settings import AppSettings
+from src.routes import rag
+from src.services.admission import AdmissionRejected
+
+
+@pytest.fixture
+def client(rag_app):
+    with TestClient(rag_app) as test_client:
+        yield test_client
+
+
+def test_chat_against_stub_llm(client):
+    response = client.post("/api/chat", json={"query": "What is on the week 3 agenda?"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["answer"].startswith("The bootcamp materials")
+    assert body["sources"][0]["file_name"] == "week_3_agenda.md"
+    assert rag.admission_controller.stats()["active"] == 0
+
+
+def test_filters_apply_to_one_request_only(client):
+    client.post("/api/chat", json={"query": "week 3?", "session_id": "s1", "role": "Engineers"})
+    client.post("/api/chat", json={"query": "and week 4?", "session_id": "s1"})
+
+    seen = rag.sessions["s1"].retriever.seen_filters
+    assert seen[0].role == "engineer"
+    # Same session, no role: the previous request's scope must not stick
+    assert seen[-1].is_empty()
+
+
+def test_sessions_share_one_retriever_and_are_evicted_lru(client, monkeypatch):
+    monkeypatch.setattr(AppSettings, "MAX_SESSIONS", 2)
+    for session_id in ("a", "b", "a", "c"):
+        assert client.post("/api/chat", json={"query": "week 3?", "session_id": session_id}).status_code == 200
+
+    # "b" was the least recently used when "c" arrived
+    assert list(rag.sessions) == ["a", "c"]
+    assert "b" not in rag.last_seen
+    assert rag.sessions["a"].retriever is rag.sessions["c"].retriever
+    assert rag.sessions["a"].memory is not rag.sessions["c"].memory
+
+
+def test_stream_releases_slot_when_stream_ends(client):
+    with client.stream("POST", "/api/chat/stream", json={"query": "week 3?"}) as response:
+        assert response.status_code == 200
+        text = "".join(response.iter_text())
+
+    assert "[SOURCES:" in text
+    assert rag.admission_controller.stats()["active"] == 0
+
+
+def test_rejection_is_503_with_retry_after(client, monkeypatch):
+    async def reject(priority, deadline=None):
+        raise AdmissionRejected("Server busy, expected wait exceeds deadline", 7.2)
+
+    monkeypatch.setattr(rag.admission_controller, "acquire", reject)
+    response = client.post("/api/chat", json={"query": "week 3?"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "8"
+    assert response.json()["detail"]["retry_after"] == 8
+
+
+@pytest.fixture
+def admin_client():
+    from src.routes.admin import router as admin_router
+
+    app = FastAPI()
+    app.include_router(admin_router, prefix="/api/admin")
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_admin_endpoints_disabled_without_admin_token(admin_client, monkeypatch):
+    monkeypatch.setattr(AppSettings, "ADMIN_TOKEN", "")
+    response = admin_client.get("/api/admin/profiles", headers={"X-Admin-Token": ""})
+    assert response.status_code == 403
+
+    monkeypatch.setattr(AppSettings, "ADMIN_TOKEN", "s3cret")
+    assert admin_client.get("/api/admin/profiles").status_code == 403
+    assert admin_client.get("/api/admin/profiles", headers={"X-Admin-Token": "nope"}).status_code == 403
+    assert admin_client.get("/api/admin/profiles", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+
+
+@pytest.mark.parametrize("value, expected", [("1", True), ("true", True), ("0", False), ("false", False), (None, False)])
+def test_x_profile_header_is_parsed(value, expected, monkeypatch):
+    monkeypatch.setattr(AppSettings, "ADMIN_TOKEN", "s3cret")
+    forced = []
+    monkeypatch.setattr(rag.profiler, "begin", lambda label, force=False: forced.append(force))
+
+    rag.start_profile("chat", value, "s3cret")
+    assert forced == [expected]
@@ -0,0 +1,74 @@
+import json
+
+from llama_index.core.llms import ChatMessage, ChatResponse, MessageRole
+
+from src.services.batch_service import BatchQAService, errors_path_for, load_completed_ids
+
+
+class FlakyLLM:
+    """Answers every question, except the ids in `failing` (once each)."""
+
+    def __init__(self, failing):
+        self.failing = set(failing)
+
+    async def achat(self, messages):
+        question = messages[-1].content
+        for qid in list(self.failing):
+            if f"question {qid}?" in question:
+                self.failing.discard(qid)
+                raise RuntimeError("backend unavailable")
+        return ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content="answer"))
+
+
+class NoRetriever:
+    def retrieve_batch(self, queries, filters=None):
+        return [[] for _ in queries]
+
+
+def make_service(llm) -> BatchQAService:
+    service = BatchQAService.__new__(BatchQAService)
+    service.max_in_flight = 2
+    service.batch_size = 2
+    service.filters = None
+    service.retriever = NoRetriever()
+    service.llm = llm
+    return service
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_failures_go_to_errors_file_and_resume_retries_them(tmp_path):
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text("".join(json.dumps({"id": i, "question": f"question {i}?"}) + "\n" for i in range(5)))
+    answers = tmp_path / "answers.jsonl"
+
+    first = make_service(FlakyLLM(failing={"3"})).run(str(questions), str(answers))
+    assert first["failed"] == 1
+    assert sorted(r["id"] for r in read_jsonl(answers)) == ["0", "1", "2", "4"]
+    assert [r["id"] for r in read_jsonl(errors_path_for(str(answers)))] == ["3"]
+
+    second = make_service(FlakyLLM(failing=set())).run(str(questions), str(answers))
+    assert second["answered"] == 1
+    assert sorted(r["id"] for r in read_jsonl(answers)) == ["0", "1", "2", "3", "4"]
+    assert read_jsonl(errors_path_for(str(answers))) == []
+
+
+def test_resume_cleans_error_records_and_truncated_lines(tmp_path):
+    answers = tmp_path / "answers.jsonl"
+    answers.write_text(
+        json.dumps({"id": "1", "answer": "a"}) + "\n"
+        + json.dumps({"id": "2", "error": "timeout"}) + "\n"
+        + json.dumps({"id": "1", "answer": "a"}) + "\n"
+        + '{"id": "3", "ans'
+    )
+
+    assert load_completed_ids(str(answers)) == {"1"}
+    assert read_jsonl(answers) == [{"id": "1", "answer": "a"}]
+
+
+def test_errors_path_for():
+    assert errors_path_for("out/answers.jsonl") == "out/answers.errors.jsonl"
+    assert errors_path_for("answers") == "answers.errors.jsonl"
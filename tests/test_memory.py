@@ -0,0 +1,108 @@
+from llama_index.core.llms import ChatMessage, MessageRole, MockLLM
+
+from src.services.memory import SUMMARY_PREFIX, CompactChatMemory
+
+
+def words(n: int, word: str = "w") -> str:
+    """Text that is exactly n tokens with the whitespace tokenizer used below."""
+    return " ".join([word] * n)
+
+
+def make_memory(**kwargs) -> CompactChatMemory:
+    return CompactChatMemory(tokenizer_fn=str.split, **kwargs)
+
+
+def put_turn(memory: CompactChatMemory, user_tokens: int, assistant_tokens: int):
+    memory.put(ChatMessage(role=MessageRole.USER, content=words(user_tokens, "q")))
+    memory.put(ChatMessage(role=MessageRole.ASSISTANT, content=words(assistant_tokens, "a")))
+
+
+def test_get_keeps_newest_messages_within_token_limit():
+    memory = make_memory(token_limit=25)
+    for _ in range(3):
+        put_turn(memory, 5, 5)
+
+    messages = memory.get()
+
+    # 30 tokens stored, 25 allowed: the oldest user message is dropped and the
+    # orphaned assistant reply after it too (history must start with a user message)
+    assert len(messages) == 4
+    assert messages[0].role == MessageRole.USER
+    assert sum(len(str(m.content).split()) for m in messages) == 20
+
+
+def test_get_respects_initial_token_count():
+    memory = make_memory(token_limit=25)
+    for _ in range(3):
+        put_turn(memory, 5, 5)
+
+    assert len(memory.get(initial_token_count=15)) == 2
+    assert memory.get(initial_token_count=25) == []
+
+
+def test_compact_and_expand_round_trip():
+    memory = make_memory()
+    put_turn(memory, 4, 6)
+    before = [(m.role, m.content) for m in memory.get_all()]
+
+    memory.compact()
+    assert all(isinstance(c, bytes) for c in memory._contents)
+    # Reads decompress on the fly without changing what callers see
+    assert [(m.role, m.content) for m in memory.get_all()] == before
+    assert [(m.role, m.content) for m in memory.get()] == before
+
+    # A new message means the session is active again: everything is expanded
+    memory.put(ChatMessage(role=MessageRole.USER, content="next question"))
+    assert all(isinstance(c, str) for c in memory._contents)
+    assert [(m.role, m.content) for m in memory.get_all()][:2] == before
+
+
+def test_summary_replaces_oldest_turns_and_cuts_on_user_message():
+    memory = make_memory(
+        token_limit=1000,
+        summarize_threshold=40,
+        keep_recent_tokens=15,
+        llm=MockLLM(max_tokens=3),
+    )
+    for _ in range(4):
+        put_turn(memory, 5, 6)  # 44 tokens after the 4th turn: over the threshold
+        memory.wait_for_summary(timeout=5)
+
+    messages = memory.get_all()
+    assert messages[0].role == MessageRole.SYSTEM
+    assert messages[0].content.startswith(SUMMARY_PREFIX)
+
+    # Only whole turns are kept verbatim, at most keep_recent_tokens of them
+    kept = messages[1:]
+    assert kept[0].role == MessageRole.USER
+    assert sum(len(str(m.content).split()) for m in kept) <= 15
+    assert memory._total_tokens == sum(memory._tokens)
+
+
+def test_no_summary_without_llm():
+    memory = make_memory(summarize_threshold=10)
+    for _ in range(3):
+        put_turn(memory, 5, 5)
+
+    assert memory._summary_thread is None
+    assert len(memory.get_all()) == 6
+
+
+def test_reset_drops_history_and_summary():
+    memory = make_memory(summarize_threshold=20, keep_recent_tokens=10, llm=MockLLM(max_tokens=3))
+    for _ in range(3):
+        put_turn(memory, 5, 5)
+    memory.wait_for_summary(timeout=5)
+
+    memory.reset()
+    assert memory.get_all() == []
+    assert memory._total_tokens == 0
+
+
+def test_message_count_does_not_expand_compacted_history():
+    memory = make_memory()
+    put_turn(memory, 4, 6)
+    memory.compact()
+
+    assert memory.message_count() == 2
+    assert all(isinstance(c, bytes) for c in memory._contents)
@@ -0,0 +1,79 @@
+import json
+
+from src.loadtest.recorder import TrafficRecorder, load_recording
+from src.loadtest.replay import build_schedule, run_replay, session_slot
+from src.routes import rag
+from src.services.admission import AdmissionRejected
+
+
+def test_qps_schedule_cycles_the_recording():
+    records = [{"t": 0.0, "query": "a"}, {"t": 5.0, "query": "b"}]
+
+    schedule = build_schedule(records, qps=4, speed=1.0, duration=1.0)
+
+    assert [item["at"] for item in schedule] == [0.0, 0.25, 0.5, 0.75]
+    assert [item["query"] for item in schedule] == ["a", "b", "a", "b"]
+    assert [item["at"] for item in build_schedule(records, None, speed=5.0, duration=None)] == [0.0, 1.0]
+
+
+def test_replay_reports_statuses_rejections_and_percentiles(rag_server, monkeypatch):
+    admit = rag.admission_controller.acquire
+    calls = []
+
+    async def reject_every_third(priority, deadline=None):
+        calls.append(priority)
+        if len(calls) % 3 == 0:
+            raise AdmissionRejected("Server busy, expected wait exceeds deadline", 1.0)
+        return await admit(priority, deadline)
+
+    monkeypatch.setattr(rag.admission_controller, "acquire", reject_every_third)
+    records = [
+        {"t": 0.0, "endpoint": "chat", "session": "s1", "query": "week 3?", "role": "engineer"},
+        {"t": 0.1, "endpoint": "chat/stream", "session": "s2", "query": "week 4?"},
+        {"t": 0.2, "endpoint": "chat", "session": "s1", "query": "and week 5?", "category": "week"},
+    ]
+
+    report = run_replay(records, rag_server, qps=20, concurrency=4, duration=0.6, sessions=2)
+
+    assert report["requests"] == 12
+    assert report["status_codes"] == {"200": 8, "503": 4}
+    assert report["rejected_503"] == 4 and report["succeeded"] == 8
+    assert report["error_rate"] == 4 / 12
+    latency = report["latency"]
+    assert latency["count"] == 8
+    assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    assert report["ttfb"]["p50"] <= latency["p50"]
+    assert report["client_queue_delay"]["count"] == 12
+    # Recorded sessions fold into the bounded pool: one server-side session per slot, not per request
+    assert len(rag.sessions) == len({session_slot(s, 2) for s in ("s1", "s2")})
+
+
+def test_recording_keeps_filters_salt_and_one_timeline_across_restarts(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    request = rag.ChatRequest(
+        query="mail me at jo@example.com",
+        session_id="s1",
+        role="engineer",
+        category="week",
+        source_file="week_3.md",
+    )
+
+    first = TrafficRecorder(path=path)
+    first.record("chat", request)
+    first.flush(timeout=5)
+    # A restarted server appends to the same file with the persisted salt
+    second = TrafficRecorder(path=path)
+    second.record("chat/stream", request)
+    second.flush(timeout=5)
+
+    assert first.salt == second.salt
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0]["session"] == lines[1]["session"] != "s1"
+    assert lines[0]["query"] == "mail me at <email>"
+    assert (lines[0]["category"], lines[0]["source_file"]) == ("week", "week_3.md")
+    assert lines[1]["t"] >= lines[0]["t"] > 1e9  # wall clock, not seconds since start
+
+    records = load_recording(path)
+    assert records[0]["t"] == 0.0
+    assert [r["endpoint"] for r in records] == ["chat", "chat/stream"]
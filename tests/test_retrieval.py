@@ -0,0 +1,129 @@
+import threading
+
+from llama_index.core.schema import TextNode
+
+from src.indexing.dedup import dedupe_nodes
+from src.preprocessing.metadata import membership_key
+from src.retrieval.filters import (
+    MetadataBitmaps,
+    RetrievalFilters,
+    current_filters,
+    filters_scope,
+)
+from src.retrieval.retriever import HybridRAGRetriever, build_bm25
+
+
+def tagged(role: str, week: int, source_file: str) -> dict:
+    """Metadata as NodeMetadataTagger stores it."""
+    return {
+        "role": role,
+        "week": week,
+        "category": "week",
+        "source_file": source_file,
+        membership_key("week", week): True,
+        membership_key("category", "week"): True,
+        membership_key("source_file", source_file): True,
+    }
+
+
+NODES = [
+    TextNode(id_=f"n{i}", text=text, metadata=tagged(role, week, f"f{i}.md"))
+    for i, (text, role, week) in enumerate(
+        [
+            ("Week 3 assignment: build the data pipeline and submit the notebook.", "data_scientist", 3),
+            ("Week 3 assignment: ship the API endpoint with tests.", "engineer", 3),
+            ("Week 4 assignment: deploy the data pipeline to production.", "data_scientist", 4),
+            ("Shared resources: the training playlist and the agenda for every week.", "all", 0),
+        ]
+    )
+]
+
+
+def bm25_only_retriever(top_k: int = 3) -> HybridRAGRetriever:
+    """The BM25 half of HybridRAGRetriever, without Chroma or the embedding model."""
+    retriever = HybridRAGRetriever.__new__(HybridRAGRetriever)
+    retriever.top_k = top_k
+    retriever.filters = None
+    retriever.nodes = NODES
+    retriever.bm25 = build_bm25(NODES)
+    retriever.bitmaps = MetadataBitmaps(NODES)
+    return retriever
+
+
+def ids(results):
+    return [n.node.node_id for n in results]
+
+
+def test_chroma_where_matches_shared_material_for_a_role():
+    where = RetrievalFilters(role="engineer", week=3).to_chroma_where()
+    assert where == {"$and": [{"role": {"$in": ["engineer", "all"]}}, {"week_3": True}]}
+    assert RetrievalFilters().to_chroma_where() is None
+
+
+def test_bitmap_mask_ands_fields_and_ors_values():
+    bitmaps = MetadataBitmaps(NODES)
+    assert bitmaps.mask(RetrievalFilters(role="data_scientist")).tolist() == [True, False, True, True]
+    assert bitmaps.mask(RetrievalFilters(role="data_scientist", week=3)).tolist() == [True, False, False, False]
+    assert not bitmaps.mask(RetrievalFilters(week=9)).any()
+
+
+def test_filters_scope_is_per_thread_and_restored():
+    seen = {}
+
+    def other_request():
+        seen["other"] = current_filters()
+
+    with filters_scope(RetrievalFilters(role="engineer")):
+        thread = threading.Thread(target=other_request)
+        thread.start()
+        thread.join()
+        seen["inside"] = current_filters()
+
+    assert seen["inside"].role == "engineer"
+    assert seen["other"] is None
+    assert current_filters() is None
+
+
+def test_filtered_bm25_uses_the_same_index_as_unfiltered():
+    retriever = bm25_only_retriever(top_k=4)
+    query = ["data pipeline assignment"]
+
+    unfiltered = retriever._bm25_retrieve(query, None)[0]
+    data_scientist = retriever._bm25_retrieve(query, RetrievalFilters(role="data_scientist"))[0]
+    week_3 = retriever._bm25_retrieve(query, RetrievalFilters(week=3))[0]
+
+    # A filter only removes documents: the survivors keep their unfiltered scores and order
+    unfiltered_scores = {n.node.node_id: n.score for n in unfiltered}
+    assert ids(data_scientist) == [i for i in ids(unfiltered) if i in ("n0", "n2", "n3")]
+    assert all(n.score == unfiltered_scores[n.node.node_id] for n in data_scientist)
+    assert set(ids(week_3)) <= {"n0", "n1"}
+    assert retriever._bm25_retrieve(query, RetrievalFilters(week=9)) == [[]]
+
+
+def test_bm25_results_do_not_share_metadata_with_the_corpus():
+    retriever = bm25_only_retriever()
+    result = retriever._bm25_retrieve(["data pipeline"], None)[0][0]
+    result.node.metadata["bm25_raw_score"] = 1.0
+    assert "bm25_raw_score" not in NODES[int(result.node.node_id[1:])].metadata
+
+
+def test_merged_duplicates_still_match_every_source_week_and_file():
+    link_list = "Resources: the training playlist, the agenda and the office hours calendar links. " * 3
+    nodes = [
+        TextNode(id_="w3", text=link_list, metadata=tagged("engineer", 3, "week_3.md")),
+        TextNode(id_="w5", text=link_list + "See you!", metadata=tagged("designer", 5, "week_5.md")),
+    ]
+
+    kept, report = dedupe_nodes(nodes, threshold=0.8)
+
+    assert report["clusters"] == 1 and len(kept) == 1
+    bitmaps = MetadataBitmaps(kept)
+    for week in (3, 5):
+        assert bitmaps.mask(RetrievalFilters(week=week)).tolist() == [True]
+    assert bitmaps.mask(RetrievalFilters(week=4)).tolist() == [False]
+    # The file whose chunk was merged away is still searchable by name
+    for source_file in ("week_3.md", "week_5.md"):
+        assert bitmaps.mask(RetrievalFilters(source_file=source_file)).tolist() == [True]
+    assert bitmaps.mask(RetrievalFilters(source_file="week_4.md")).tolist() == [False]
+    assert bitmaps.mask(RetrievalFilters(role="pm")).tolist() == [True]  # merged roles -> "all"
+    assert "week_3" in kept[0].excluded_llm_metadata_keys